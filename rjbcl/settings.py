@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'statement_tracker.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'statement_tracker.banks.BankCatalogueMiddleware',
 ]
 
 ROOT_URLCONF = 'rjbcl.urls'
@@ -83,12 +86,51 @@ WSGI_APPLICATION = 'rjbcl.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgresql selects the production profile; anything else, the
+# SQLite file used for development and single-desk installs.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'rjbcl'),
+            'USER': os.environ.get('DB_USER', 'rjbcl'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Keep each worker's connection open across requests, and check it
+            # is still alive before reusing it. Under ASGI, or with many
+            # workers, set DB_CONN_MAX_AGE=0 and put PgBouncer in front instead.
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # WAL lets readers run alongside the writer, and taking the
+                # write lock when a transaction begins (not on its first
+                # write) makes a waiting writer honour the busy timeout
+                # instead of failing with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-64000;'
+                    'PRAGMA mmap_size=268435456;'
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -127,17 +169,52 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded voucher images and their renditions. Their names are content
+# hashes, so the web server can send them with a long, immutable max-age.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# Dashboard metrics are cached here. With several server processes, point this
+# at a shared backend (Redis or Memcached) so invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rjbcl',
+    }
+}
+
+# Request instrumentation
+# INSTRUMENTATION_PROFILING honours an "X-Profile: 1" request header;
+# INSTRUMENTATION_PROFILE_SAMPLE_RATE profiles that fraction of all requests.
+INSTRUMENTATION_PROFILING = DEBUG
+INSTRUMENTATION_PROFILE_SAMPLE_RATE = 0.0
+INSTRUMENTATION_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Pre-generated OpenAPI schema files (manage.py generate_openapi_schema)
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+
 # Rest framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),}
 
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'statement_tracker.serializers.UserTokenObtainPairSerializer',
+    # Tokens carry a hash of the password, so changing it revokes them.
+    'CHECK_REVOKE_TOKEN': True,
+}
+# Set AUTH_USER_STATE_TIMEOUT to change how many seconds
+# StatelessJWTAuthentication may trust a cached user's active and staff
+# flags and password hash; the default is USER_STATE_TIMEOUT in
+# statement_tracker/authentication.py.
+
 
 ## Email settings
 ## use rbs99@gmail.com
@@ -14,16 +14,19 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path,include
 from django.urls import path, re_path, include
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from statement_tracker.views import api_index, dashboard
+from statement_tracker.schema import get_cached_schema_view
 
-# Schema view for swagger
-schema_view = get_schema_view(
+# Schema view for swagger. The spec is generated once per code version,
+# see statement_tracker/schema.py and `manage.py generate_openapi_schema`.
+schema_view = get_cached_schema_view(
    openapi.Info(
       title="Your API Title",
       default_version='v1',
@@ -52,8 +55,5 @@ urlpatterns = [
 
 ]
 
-
-
-
-
-
+# Uploaded files; served by the web server in production.
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,6 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Bank, Transaction
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .images import rendition_urls
+from .models import User, Bank, Transaction, OutgoingEmail
 
 # Custom User Admin
 class UserAdmin(BaseUserAdmin):
@@ -34,19 +40,51 @@ class BankAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     ordering = ('name',)
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses PostgreSQL's planner estimate instead of COUNT(*) for an unfiltered
+    changelist of a large table. Page links past the real end are empty.
+    """
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > self.ESTIMATE_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
 # Transaction Admin
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = (
         'system_voucher_no', 'bank', 'bank_account_no', 'voucher_amount', 'status',
-        'created_by', 'created_date', 'system_value_date', 'is_verified'
+        'created_by', 'created_date', 'system_value_date', 'is_verified', 'voucher_thumbnail'
     )
+    list_select_related = ('bank', 'created_by')
     list_filter = ('status', 'is_verified', 'bank', 'source', 'bank_deposit_date', 'system_value_date', 'created_date')
+    # Both follow txn_created_idx; the id makes the order total, so the
+    # changelist does not append a -pk the index cannot serve.
+    date_hierarchy = 'created_date'
+    ordering = ('-created_date', 'id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Indexed identifiers, tried as exact matches before the text search.
+    exact_search_fields = ('system_voucher_no', 'bank_trans_id', 'cheque_no', 'policy_no')
     search_fields = (
         'system_voucher_no', 'bank_account_no', 'bank_trans_id', 'cheque_no',
-        'policy_no', 'transaction_detail', 'created_by__username', 'bank__name'
+        'policy_no', 'transaction_detail'
     )
-    readonly_fields = ('created_date', 'created_by') # Often 'created_by' is set automatically
+    autocomplete_fields = ('bank',)
+    raw_id_fields = ('reconciled_by', 'system_posted_by', 'system_verified_by')
+    readonly_fields = ('created_date', 'created_by', 'voucher_preview') # Often 'created_by' is set automatically
 
     fieldsets = (
         ('Core Information', {
@@ -66,22 +104,59 @@ class TransactionAdmin(admin.ModelAdmin):
             'fields': ('cheque_no', 'policy_no', 'reverse_voucher_no', 'reversal_correction_voucher_no', 'refund_voucher_no')
         }),
         ('Attachments & Remarks', {
-            'fields': ('voucher_image', 'remarks')
+            'fields': ('voucher_image', 'voucher_preview', 'remarks')
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        A term that exactly matches a voucher, bank transaction id, cheque or
+        policy number is answered from their indexes; only other terms fall
+        back to the icontains search over ``search_fields``.
+        """
+        term = search_term.strip()
+        if term and len(term.split()) == 1:
+            exact = queryset.filter(Q.create([(field, term) for field in self.exact_search_fields], Q.OR))
+            if exact.exists():
+                return exact, False
+        return super().get_search_results(request, queryset, search_term)
+
     def save_model(self, request, obj, form, change):
         if not obj.pk: # if creating new object
             obj.created_by = request.user
-        super().save_model(request, obj, form, change)
+        # The model form has already run full_clean().
+        obj.save(validate=False)
+
+    # Renditions only: originals can be several megabytes each.
+    @admin.display(description='Voucher')
+    def voucher_thumbnail(self, obj):
+        urls = rendition_urls(obj.voucher_image)
+        if urls is None:
+            return '-'
+        return format_html(
+            '<picture><source srcset="{}" type="image/webp">'
+            '<img src="{}" height="48" loading="lazy" alt=""></picture>',
+            urls['thumbnail'], urls['thumbnail_jpeg'],
+        )
+
+    @admin.display(description='Voucher preview')
+    def voucher_preview(self, obj):
+        urls = rendition_urls(obj.voucher_image)
+        if urls is None:
+            return '-'
+        return format_html(
+            '<a href="{}"><picture><source srcset="{}" type="image/webp">'
+            '<img src="{}" width="480" loading="lazy" alt=""></picture></a>',
+            obj.voucher_image.url, urls['display'], urls['display_jpeg'],
+        )
+
+
+# Outbox Admin
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_date', 'sent_date')
+    list_filter = ('status',)
+    readonly_fields = ('created_date', 'sent_date', 'attempts', 'last_error')
+    # Bodies can carry password reset links.
+    exclude = ('body',)
 
-    # If you want to display the image in admin (optional)
-    # def voucher_image_tag(self, obj):
-    #     from django.utils.html import format_html
-    #     if obj.voucher_image:
-    #         return format_html('<img src="{}" width="150" height="auto" />', obj.voucher_image.url)
-    #     return "-"
-    # voucher_image_tag.short_description = 'Voucher Image Preview'
-    #
-    # # Add to list_display or readonly_fields if needed
-    # readonly_fields = ('created_date', 'created_by', 'voucher_image_tag')
\ No newline at end of file
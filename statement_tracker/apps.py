@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StatementTrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'statement_tracker'
+
+    def ready(self):
+        from . import signals  # noqa: F401
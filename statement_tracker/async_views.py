@@ -0,0 +1,123 @@
+"""
+Async versions of the hot read endpoints, for deployments under ASGI.
+
+DRF views are synchronous, so under ASGI every request to them is handed to
+the thread pool. These views run on the event loop: authentication and the
+database reads use the async ORM, and the viewsets are reused for query
+building, filtering, pagination, ETags and serialization, none of which
+touch the database once the rows are loaded. Responses are the same as the
+synchronous endpoints'. Authentication is StatelessJWTAuthentication's, so
+``request.user`` is a TokenUser.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import StatelessJWTAuthentication
+from .banks import bank_cache
+from .models import Transaction
+from .serializers import UserDetailSerializer
+from .viewsets import BankViewSet, TransactionViewSet
+
+User = get_user_model()
+
+jwt_authentication = StatelessJWTAuthentication()
+renderer = JSONRenderer()
+
+
+async def authenticate(request):
+    """The async counterpart of StatelessJWTAuthentication.authenticate()."""
+    header = jwt_authentication.get_header(request)
+    raw_token = jwt_authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+    return await jwt_authentication.aget_user(jwt_authentication.get_validated_token(raw_token))
+
+
+def render(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+def async_api_view(handler):
+    """
+    Authenticate the request, hand ``handler`` a DRF Request for it, and
+    turn API exceptions into responses shaped like DRF's.
+    """
+    @wraps(handler)
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = render({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            api_request = Request(request)
+            api_request.user = await authenticate(request)
+            async with bank_cache.pinned():
+                return await handler(api_request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = render(detail, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = jwt_authentication.authenticate_header(request)
+            return response
+    return view
+
+
+def get_viewset(viewset_class, request, action, **kwargs):
+    view = viewset_class(request=request, action=action, format_kwarg=None, args=(), kwargs=kwargs)
+    view.headers = {}
+    return view
+
+
+async def list_response(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    if view.paginator is not None:
+        page = await view.paginator.apaginate_queryset(queryset, view.request, view)
+    else:
+        page = None
+    rows = [obj async for obj in queryset] if page is None else page
+
+    etag = view.get_list_etag(rows, page is not None)
+    response = get_conditional_response(view.request, etag=etag)
+    if response is None:
+        data = view.get_serializer(rows, many=True).data
+        if page is not None:
+            data = view.get_paginated_response(data).data
+        response = render(data)
+    response['ETag'] = etag
+    return response
+
+
+@async_api_view
+async def transaction_list(request):
+    return await list_response(get_viewset(TransactionViewSet, request, 'list'))
+
+
+@async_api_view
+async def transaction_detail(request, pk):
+    view = get_viewset(TransactionViewSet, request, 'retrieve', pk=pk)
+    try:
+        instance = await view.get_queryset().aget(pk=pk)
+    except (Transaction.DoesNotExist, ValueError):
+        raise exceptions.NotFound('No Transaction matches the given query.')
+    response = view.check_preconditions(request, instance)
+    if response is None:
+        response = render(view.get_serializer(instance).data)
+    return view.set_validators(response, instance)
+
+
+@async_api_view
+async def bank_list(request):
+    return await list_response(get_viewset(BankViewSet, request, 'list'))
+
+
+@async_api_view
+async def user_me(request):
+    user = await User.objects.aget(pk=request.user.id)
+    return render(UserDetailSerializer(user, context={'request': request}).data)
+
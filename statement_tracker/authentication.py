@@ -0,0 +1,117 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# How long a user's state may be served from the cache, unless the
+# AUTH_USER_STATE_TIMEOUT setting says otherwise. Saving or deleting the
+# user drops it at once; the timeout bounds changes made behind the ORM's
+# back, such as queryset.update().
+USER_STATE_TIMEOUT = 60
+
+
+class UserState(NamedTuple):
+    is_active: bool
+    is_staff: bool
+    # get_md5_hash_password() of the password hash, as in the revoke claim.
+    password: str
+
+
+def _state_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _state_from_row(row):
+    # A missing user is cached as inactive, so deleted accounts are denied too.
+    if row is None:
+        return UserState(False, False, '')
+    is_active, is_staff, password = row
+    return UserState(is_active, is_staff, get_md5_hash_password(password))
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_USER_STATE_TIMEOUT', USER_STATE_TIMEOUT)
+
+
+def get_user_state(user_id):
+    state = cache.get(_state_key(user_id))
+    if state is None:
+        row = User.objects.filter(pk=user_id).values_list('is_active', 'is_staff', 'password').first()
+        state = _state_from_row(row)
+        cache.set(_state_key(user_id), state, timeout=_timeout())
+    return state
+
+
+async def aget_user_state(user_id):
+    state = await cache.aget(_state_key(user_id))
+    if state is None:
+        row = await User.objects.filter(pk=user_id).values_list('is_active', 'is_staff', 'password').afirst()
+        state = _state_from_row(row)
+        await cache.aset(_state_key(user_id), state, timeout=_timeout())
+    return state
+
+
+def invalidate_user_state(user_id):
+    """Drop the cached state now, and again on commit in case it was re-read meanwhile."""
+    cache.delete(_state_key(user_id))
+    db_transaction.on_commit(lambda: cache.delete(_state_key(user_id)))
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """A refresh token, and so its access tokens, carrying username and is_staff claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        return token
+
+
+def check_token_user(validated_token, state):
+    """
+    Return a TokenUser for a token whose claims still match the user's
+    state, so deactivating a user, changing their password or their staff
+    flag revokes the tokens issued before.
+    """
+    if not state.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != state.password:
+        raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+    if validated_token.get('is_staff') != state.is_staff:
+        raise AuthenticationFailed('User permissions have changed; log in again.', code='token_stale')
+    return TokenUser(validated_token)
+
+
+def _user_id(validated_token):
+    try:
+        return validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication without loading the User row. ``request.user`` is a
+    TokenUser built from the token's id, username and is_staff claims, so
+    code behind it must use ids (``created_by_id=request.user.id``) rather
+    than model instances. The claims are checked against the user's state,
+    which is cached for AUTH_USER_STATE_TIMEOUT seconds: steady state is one
+    cache read and no queries per request.
+    """
+
+    def get_user(self, validated_token):
+        return check_token_user(validated_token, get_user_state(_user_id(validated_token)))
+
+    async def aget_user(self, validated_token):
+        return check_token_user(validated_token, await aget_user_state(_user_id(validated_token)))
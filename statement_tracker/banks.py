@@ -0,0 +1,179 @@
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+
+from .models import Bank
+
+VERSION_KEY = 'banks:version'
+# Bounds how long a catalogue read inside a transaction that then rolled
+# back can linger in the shared cache.
+CATALOGUE_TIMEOUT = 5 * 60
+# How long a process trusts its own copy without rereading the rows. The
+# version alone cannot be trusted with a per-process cache (LocMemCache),
+# where another process's bank writes never bump it.
+LOCAL_TIMEOUT = 60
+CATALOGUE_FIELDS = ('id', 'name', 'account_no', 'description', 'updated_date')
+
+# Catalogue fixed for the current request or async task, see BankCache.pin()
+# and pinned(): a one-item list, filled by the first lookup.
+_pinned = ContextVar('pinned_bank_catalogue', default=None)
+
+
+class Catalogue(NamedTuple):
+    version: str
+    by_id: dict
+    # Lower-cased name -> Bank. Kept apart from by_id, so a bank named "3"
+    # cannot shadow the bank with id 3.
+    by_name: dict
+    loaded: float
+
+    def resolve(self, value):
+        """The bank with id or name ``value``; an id wins over an equal name."""
+        bank = self.by_id.get(int(value)) if value.isdecimal() else None
+        return bank or self.by_name.get(value.lower())
+
+
+class BankCache:
+    """
+    Read-through cache of the Bank table. The table is small, so each process
+    keeps the whole catalogue rather than single rows, which also answers
+    name lookups. The catalogue is shared through Django's cache under a
+    version stamp; a Bank save or delete stamps a new version.
+
+    Within a request (BankCatalogueMiddleware) the first access pins the
+    catalogue, so the steady state costs one cache read per request (the
+    version) and no queries. Each process rereads the rows at least every
+    LOCAL_TIMEOUT seconds. The Bank instances are shared, so treat them as
+    read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogue = None
+
+    def _current(self):
+        pin = _pinned.get()
+        if pin is not None and pin[0] is not None:
+            return pin[0]
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+        catalogue = self._catalogue
+        if catalogue is None or catalogue.version != version:
+            with self._lock:
+                catalogue = self._catalogue = self._load(version)
+        elif time.monotonic() - catalogue.loaded > LOCAL_TIMEOUT:
+            with self._lock:
+                catalogue = self._catalogue = self._load(version, reread=True)
+        if pin is not None:
+            pin[0] = catalogue
+        return catalogue
+
+    def _load(self, version, reread=False):
+        key = f'banks:catalogue:{version}'
+        rows = None if reread else cache.get(key)
+        if rows is None:
+            rows = list(Bank.objects.order_by().values_list(*CATALOGUE_FIELDS))
+            cache.set(key, rows, timeout=CATALOGUE_TIMEOUT)
+        by_id, by_name = {}, {}
+        for row in rows:
+            bank = Bank(**dict(zip(CATALOGUE_FIELDS, row)))
+            bank._state.adding = False
+            bank._state.db = DEFAULT_DB_ALIAS
+            by_id[bank.pk] = by_name[bank.name.lower()] = bank
+        return Catalogue(version, by_id, by_name, time.monotonic())
+
+    @contextmanager
+    def pin(self):
+        """
+        Use one catalogue for the rest of the block: the first lookup reads
+        the version and later ones reuse what it found.
+        """
+        token = _pinned.set([None])
+        try:
+            yield
+        finally:
+            _pinned.reset(token)
+
+    @asynccontextmanager
+    async def pinned(self):
+        """
+        For async views: load the catalogue (in a thread only when it is
+        stale) and use that snapshot for the rest of the task, so later
+        synchronous lookups never reach the database from the event loop.
+        """
+        catalogue = self._catalogue
+        if (catalogue is None or catalogue.version != await cache.aget(VERSION_KEY)
+                or time.monotonic() - catalogue.loaded > LOCAL_TIMEOUT):
+            catalogue = await sync_to_async(self._current)()
+        token = _pinned.set([catalogue])
+        try:
+            yield catalogue
+        finally:
+            _pinned.reset(token)
+
+    def get(self, pk):
+        return self._current().by_id.get(pk)
+
+    def get_by_name(self, name):
+        return self._current().by_name.get(name.lower())
+
+    def catalogue(self):
+        return self._current()
+
+    def clear(self):
+        self._catalogue = None
+        _bump_version()
+
+    def invalidate(self):
+        """
+        Stamp a new version now, so this transaction sees its own change,
+        and again on commit, so no process keeps a catalogue read before it.
+        A pinned catalogue is dropped for the same reason.
+        """
+        _bump_version()
+        pin = _pinned.get()
+        if pin is not None:
+            pin[0] = None
+        db_transaction.on_commit(_bump_version)
+
+
+def _bump_version():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+bank_cache = BankCache()
+
+
+class BankCatalogueMiddleware:
+    """
+    Pins the bank catalogue for each request, so a list page asking for the
+    bank of every row reads the version from the cache once.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with bank_cache.pin():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Sync views run in a thread with a copy of this context, which
+        # shares the pin; async views pin their own with pinned().
+        with bank_cache.pin():
+            return await self.get_response(request)
@@ -0,0 +1,127 @@
+import hashlib
+
+from django.db import transaction as db_transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalModelMixin:
+    """
+    Strong ETags and Last-Modified for a ModelViewSet whose model has an
+    ``updated_date`` column. Override ``get_versions`` when the representation
+    also depends on related rows. List rows may be ``values()`` dicts.
+
+    GET answers If-None-Match / If-Modified-Since with 304 before anything is
+    serialized. PUT, PATCH and DELETE honour If-Match / If-Unmodified-Since
+    with 412, checked against the row locked for the write, so two clients
+    editing the same version cannot both win.
+    """
+    def get_versions(self, instance):
+        return [instance.updated_date]
+
+    def get_etag(self, instance):
+        versions = ','.join(version.isoformat() for version in self.get_versions(instance))
+        pk = instance['id'] if isinstance(instance, dict) else instance.pk
+        return f'"{pk}-{hashlib.md5(versions.encode()).hexdigest()[:16]}"'
+
+    def get_last_modified(self, instance):
+        return int(max(self.get_versions(instance)).timestamp())
+
+    def get_list_etag(self, rows, paginated):
+        digest = hashlib.md5(self.request.get_full_path().encode())
+        for row in rows:
+            digest.update(self.get_etag(row).encode())
+        if paginated:
+            digest.update(f'{self.paginator.get_next_link()}|{self.paginator.get_previous_link()}'.encode())
+        return f'"{digest.hexdigest()}"'
+
+    def check_preconditions(self, request, instance):
+        """Return the 304/412 response the request's conditional headers call for, or None."""
+        return get_conditional_response(
+            request, etag=self.get_etag(instance), last_modified=self.get_last_modified(instance)
+        )
+
+    def set_validators(self, response, instance):
+        response['ETag'] = self.get_etag(instance)
+        response['Last-Modified'] = http_date(self.get_last_modified(instance))
+        return response
+
+    # Other detail actions that read, check and write their object.
+    locking_actions = ()
+    lock_object = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.lock_object and (getattr(self.request, 'method', None) in ('PUT', 'PATCH', 'DELETE')
+                or getattr(self, 'action', None) in self.locking_actions):
+            # Lock the row so the version checked is the version overwritten.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def get_unlocked_object(self):
+        """get_object() without the row lock, for work done before taking it."""
+        self.lock_object = False
+        try:
+            return self.get_object()
+        finally:
+            del self.lock_object
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+
+        etag = self.get_list_etag(rows, page is not None)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            serializer = self.get_serializer(rows, many=True)
+            if page is None:
+                response = Response(serializer.data)
+            else:
+                response = self.get_paginated_response(serializer.data)
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response = self.check_preconditions(request, instance)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self.set_validators(response, instance)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        # Validate before taking the lock: validation can be slow (decoding
+        # an uploaded image) and the lock holds the row, and on SQLite the
+        # whole database, until the write commits.
+        instance = self.get_unlocked_object()
+        response = self.check_preconditions(request, instance)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+
+        with db_transaction.atomic():
+            locked = self.get_object()
+            response = self.check_preconditions(request, locked)
+            if response is not None:
+                return response
+            if self.get_versions(locked) != self.get_versions(instance):
+                # Changed since it was validated; validate against what is stored.
+                serializer = self.get_serializer(locked, data=request.data, partial=partial)
+                serializer.is_valid(raise_exception=True)
+            else:
+                serializer.instance = locked
+            self.perform_update(serializer)
+        return self.set_validators(Response(serializer.data), locked)
+
+    def destroy(self, request, *args, **kwargs):
+        with db_transaction.atomic():
+            instance = self.get_object()
+            response = self.check_preconditions(request, instance)
+            if response is not None:
+                return response
+            self.perform_destroy(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
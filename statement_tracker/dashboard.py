@@ -0,0 +1,117 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+from .models import DailySummary, Transaction
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+# Results are cached per time bucket, so even with no writes at all (or
+# writes that bypass the ORM) a cached series is never older than this.
+BUCKET_SECONDS = 60
+VERSION_KEY = 'dashboard:metrics:version'
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() so concurrent first readers agree on one starting value.
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def invalidate():
+    """
+    Drop every cached metrics bucket by bumping the version in the keys.
+    Runs after the surrounding transaction commits, so a reader cannot cache
+    data that is about to change under the new version.
+    """
+    db_transaction.on_commit(_bump_version)
+
+
+def cache_key(days, version=None, bucket=None):
+    version = current_version() if version is None else version
+    bucket = int(time.time() // BUCKET_SECONDS) if bucket is None else bucket
+    return f'dashboard:metrics:v{version}:b{bucket}:d{days}'
+
+
+def get_metrics(days=DEFAULT_DAYS):
+    key = cache_key(days)
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = compute_metrics(days)
+        cache.set(key, metrics, timeout=BUCKET_SECONDS * 2)
+    return metrics
+
+
+def compute_metrics(days=DEFAULT_DAYS):
+    """
+    Dashboard series for the last ``days`` days of deposits. Everything but
+    the verification backlog comes from DailySummary; the backlog is read
+    through the partial index on unverified transactions.
+    """
+    today = timezone.now().date()
+    start = today - timedelta(days=days - 1)
+    window = DailySummary.objects.filter(date__gte=start, date__lte=today)
+
+    daily = {
+        row['date']: row
+        for row in window.values('date').annotate(
+            count=Sum('transaction_count'),
+            deposits=Sum('voucher_amount'),
+            refunds=Sum('refund_amount'),
+        ).order_by()
+    }
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = daily.get(day, {})
+        series.append({
+            'date': day.isoformat(),
+            'count': row.get('count') or 0,
+            'deposits': f"{row.get('deposits') or 0:.2f}",
+            'refunds': f"{row.get('refunds') or 0:.2f}",
+        })
+
+    by_source = [
+        {'source': row['source'] or None, 'count': row['count']}
+        for row in window.values('source').annotate(count=Sum('transaction_count')).order_by('source')
+    ]
+    by_status = [
+        {'status': row['status'], 'count': row['count']}
+        for row in window.values('status').annotate(count=Sum('transaction_count')).order_by('status')
+    ]
+
+    unverified = Transaction.objects.filter(is_verified=False).aggregate(
+        count=Count('id'), amount=Sum('voucher_amount'), oldest=Min('created_date'),
+    )
+    unreconciled = DailySummary.objects.exclude(status='Reconciled').aggregate(
+        count=Sum('transaction_count'),
+    )
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'date_from': start.isoformat(),
+        'date_to': today.isoformat(),
+        'daily': series,
+        'by_source': by_source,
+        'by_status': by_status,
+        'backlog': {
+            'unverified': unverified['count'],
+            'unverified_amount': f"{unverified['amount'] or 0:.2f}",
+            'oldest_unverified': unverified['oldest'].isoformat() if unverified['oldest'] else None,
+            'unreconciled': unreconciled['count'] or 0,
+        },
+    }
@@ -0,0 +1,97 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column header, queryset lookup)
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Created Date', 'created_date'),
+    ('Created By', 'created_by__username'),
+    ('Bank', 'bank__name'),
+    ('Bank Account No', 'bank_account_no'),
+    ('Bank Trans ID', 'bank_trans_id'),
+    ('Bank Deposit Date', 'bank_deposit_date'),
+    ('Cheque No', 'cheque_no'),
+    ('Policy No', 'policy_no'),
+    ('Transaction Detail', 'transaction_detail'),
+    ('System Voucher No', 'system_voucher_no'),
+    ('System Value Date', 'system_value_date'),
+    ('Debit', 'debit'),
+    ('Credit', 'credit'),
+    ('Voucher Amount', 'voucher_amount'),
+    ('Refund Amount', 'refund_amount'),
+    ('Reverse Voucher No', 'reverse_voucher_no'),
+    ('Reversal Correction Voucher No', 'reversal_correction_voucher_no'),
+    ('Refund Voucher No', 'refund_voucher_no'),
+    ('Source', 'source'),
+    ('Status', 'status'),
+    ('Verified', 'is_verified'),
+    ('Used In System', 'used_in_system'),
+    ('Reconciled By', 'reconciled_by__username'),
+    ('Reconciled Date', 'reconciled_date'),
+    ('Posted By', 'system_posted_by__username'),
+    ('Verified By', 'system_verified_by__username'),
+    ('Remarks', 'remarks'),
+]
+
+
+class Echo:
+    """A file-like object that hands back what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    """
+    Yield export rows as tuples, reading the queryset through a server-side
+    cursor so memory use does not depend on the number of rows.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_filename(extension):
+    return f'transactions-{timezone.now():%Y%m%d-%H%M%S}.{extension}'
+
+
+def csv_response(queryset):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        for row in export_rows(queryset):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename("csv")}"'
+    return response
+
+
+def xlsx_response(queryset):
+    """
+    Build the whole workbook in openpyxl's write-only mode, which spools rows
+    to a temporary file, then send that file. Unlike the CSV export nothing
+    reaches the client until the last row is written.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Transactions')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in export_rows(queryset):
+        # Excel has no timezone-aware datetimes.
+        sheet.append([timezone.make_naive(value) if getattr(value, 'tzinfo', None) else value for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=export_filename('xlsx'),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -0,0 +1,88 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .search import search
+from .serializers import TransactionFilterSerializer
+
+
+class TransactionFilterBackend(BaseFilterBackend):
+    """
+    Applies the TransactionFilterSerializer query parameters as plain column
+    lookups, so filtering happens in SQL on indexed columns.
+    """
+    lookups = {
+        'bank': 'bank__in',
+        'status': 'status__in',
+        'source': 'source__in',
+        'is_verified': 'is_verified',
+        'used_in_system': 'used_in_system',
+        'deposit_date_from': 'bank_deposit_date__gte',
+        'deposit_date_to': 'bank_deposit_date__lte',
+        'value_date_from': 'system_value_date__gte',
+        'value_date_to': 'system_value_date__lte',
+        'amount_min': 'voucher_amount__gte',
+        'amount_max': 'voucher_amount__lte',
+        'system_voucher_no': 'system_voucher_no',
+        'bank_trans_id': 'bank_trans_id',
+        'cheque_no': 'cheque_no',
+        'policy_no': 'policy_no',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = TransactionFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return self.apply(queryset, serializer.validated_data)
+
+    @classmethod
+    def apply(cls, queryset, validated_data):
+        filters = {
+            cls.lookups[name]: value
+            for name, value in validated_data.items()
+            if value is not None
+        }
+        return queryset.filter(**filters) if filters else queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = []
+        for name, field in TransactionFilterSerializer().fields.items():
+            if isinstance(field, serializers.ListField):
+                schema = {'type': 'array', 'items': {'type': 'string'}}
+            elif isinstance(field, serializers.BooleanField):
+                schema = {'type': 'boolean'}
+            elif isinstance(field, serializers.DateField):
+                schema = {'type': 'string', 'format': 'date'}
+            elif isinstance(field, serializers.DecimalField):
+                schema = {'type': 'string', 'format': 'decimal'}
+            else:
+                schema = {'type': 'string'}
+            parameters.append({
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': f'Filter on {self.lookups[name].replace("__", " ")}',
+                'schema': schema,
+            })
+        return parameters
+
+
+class TransactionSearchFilter(BaseFilterBackend):
+    """
+    ``?q=``: full-text search over the narration, remarks and identifiers.
+    Every word must match, as a prefix. Results come best match first unless
+    ``ordering`` is given.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        return search(queryset, text) if text else queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over transaction detail, remarks, voucher, cheque, '
+                           'policy and bank transaction numbers',
+            'schema': {'type': 'string'},
+        }]
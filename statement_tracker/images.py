@@ -0,0 +1,152 @@
+import hashlib
+import io
+import posixpath
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction as db_transaction
+from PIL import Image, ImageOps
+
+VOUCHER_IMAGE_DIR = 'voucher_images'
+
+# name -> (longest side in pixels, Pillow format, file extension, save options)
+RENDITIONS = {
+    'display': (1600, 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'display_jpeg': (1600, 'JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'thumbnail': (320, 'WEBP', 'webp', {'quality': 75, 'method': 4}),
+    'thumbnail_jpeg': (320, 'JPEG', 'jpg', {'quality': 75, 'optimize': True}),
+}
+
+
+def rendition_name(name, rendition):
+    """Storage name of ``rendition`` of the stored image ``name``."""
+    _, _, extension, _ = RENDITIONS[rendition]
+    stem = posixpath.splitext(name)[0]
+    return f'{stem}-{rendition.replace("_jpeg", "")}.{extension}'
+
+
+def rendition_urls(field_file):
+    """``{rendition: url}`` for a voucher image, or None when there is none."""
+    if not field_file:
+        return None
+    storage = field_file.storage
+    return {rendition: storage.url(rendition_name(field_file.name, rendition)) for rendition in RENDITIONS}
+
+
+def content_name(data, original_name):
+    """
+    ``voucher_images/ab/abcdef....jpg``: the SHA-256 of the upload, so the
+    same slip uploaded twice is stored once.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    extension = posixpath.splitext(original_name)[1].lower() or '.jpg'
+    return f'{VOUCHER_IMAGE_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def render(data):
+    """
+    ``[(rendition, bytes)]`` for an uploaded image. Decoding is finished
+    here, so a damaged upload (e.g. a truncated JPEG, which passes Pillow's
+    verify()) raises ValidationError rather than failing later.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        # JPEG phone photos decode at a fraction of their size when only
+        # the largest rendition is needed.
+        largest = max(size for size, _, _, _ in RENDITIONS.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+
+        renditions = []
+        # Largest first, so each rendition is scaled down from the previous one.
+        for rendition, (size, image_format, _, options) in sorted(
+            RENDITIONS.items(), key=lambda item: -item[1][0]
+        ):
+            if max(image.size) > size:
+                image = image.copy()
+                image.thumbnail((size, size), Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, image_format, **options)
+            renditions.append((rendition, output.getvalue()))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValidationError({'voucher_image': f'Upload a valid image. {e}'})
+    return renditions
+
+
+def prepare_upload(upload, storage):
+    """
+    ``(name, data, renditions)`` for an uploaded image, raising
+    ValidationError if it cannot be decoded. The result is kept on the
+    upload, so the decoding is done once however often it is asked for.
+    """
+    prepared = getattr(upload, 'prepared_voucher_image', None)
+    if prepared is None:
+        upload.seek(0)
+        data = upload.read()
+        name = content_name(data, upload.name)
+        renditions = None if storage.exists(name) else render(data)
+        prepared = upload.prepared_voucher_image = (name, data, renditions)
+    return prepared
+
+
+def prepare_voucher_image(field_file):
+    """prepare_upload() for a newly assigned voucher image."""
+    field_file.open('rb')
+    return prepare_upload(field_file.file, field_file.storage)
+
+
+def save_as(storage, name, content):
+    """
+    Save ``content`` under exactly ``name``. Names are content hashes, so
+    when a concurrent upload of the same image got there first the storage
+    renames ours; that copy is deleted and theirs is used.
+    """
+    saved = storage.save(name, ContentFile(content))
+    if saved != name:
+        storage.delete(saved)
+        if not storage.exists(name):
+            raise OSError(f'Storage saved {name} as {saved}.')
+
+
+def write_voucher_image(storage, prepared):
+    """
+    Write a prepared image and its renditions, unless it is already stored.
+    Orientation comes from the EXIF tag and metadata is dropped from the
+    renditions.
+    """
+    name, data, renditions = prepared
+    if not storage.exists(name):
+        for rendition, content in renditions or render(data):
+            save_as(storage, rendition_name(name, rendition), content)
+        # The original last: once it exists, so do its renditions.
+        save_as(storage, name, data)
+
+
+def store_voucher_image(field_file):
+    """
+    Store a newly assigned voucher image under its content hash, with its
+    renditions next to it, and point ``field_file`` at the stored original.
+    """
+    prepared = prepare_voucher_image(field_file)
+    write_voucher_image(field_file.storage, prepared)
+    field_file.name = prepared[0]
+    field_file._committed = True
+
+
+def store_voucher_image_on_commit(field_file, using=None):
+    """
+    store_voucher_image() for a row being saved: ``field_file`` points at
+    the content-hash name now and the files are written once the
+    transaction commits, so a rolled-back save leaves nothing behind.
+    """
+    prepared = prepare_voucher_image(field_file)
+    field_file.name = prepared[0]
+    field_file._committed = True
+    db_transaction.on_commit(
+        partial(write_voucher_image, field_file.storage, prepared), using=using, robust=True,
+    )
@@ -0,0 +1,194 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction as db_transaction
+
+from . import dashboard, summaries
+from .banks import bank_cache
+from .models import Transaction
+from .serializers import TransactionImportSerializer
+from .validators import transaction_validator
+
+IMPORT_BATCH_SIZE = 500
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(upload):
+    name = (upload.name or '').lower()
+    content_type = (getattr(upload, 'content_type', None) or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if 'json' in content_type:
+        return 'jsonl'
+    raise ImportFormatError('Upload a .csv or .jsonl (JSON lines) file.')
+
+
+def read_rows(upload, file_format=None):
+    """
+    Yield ``(row_number, row)`` pairs from an uploaded CSV or JSON-lines file.
+
+    The upload is decoded line by line, so the whole file is never held in
+    memory. A row that cannot be parsed is yielded as ``None``.
+    """
+    file_format = file_format or detect_format(upload)
+    lines = codecs.iterdecode(upload, 'utf-8-sig')
+    if file_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(lines), start=1):
+            # Empty cells mean "not provided", so model defaults apply.
+            yield row_number, {k.strip(): v for k, v in row.items() if k and v not in ('', None)}
+        return
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row_number, row if isinstance(row, dict) else None
+
+
+def bank_lookup():
+    """The bank Catalogue, for BankLookupField."""
+    return bank_cache.catalogue()
+
+
+class TransactionImporter:
+    """
+    Validates and inserts statement rows in batches inside one database
+    transaction. Nothing is written if any row fails.
+    """
+
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE, allow_duplicates=False):
+        self.user = user
+        self.allow_duplicates = allow_duplicates
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+        self._seen_vouchers = set()
+        self._seen_bank_trans_ids = set()
+        # fingerprint -> [(row number, bank_trans_id)], for duplicates within the file.
+        self._seen_fingerprints = {}
+
+    def run(self, rows):
+        self._context = {'banks': bank_lookup()}
+
+        rows = iter(rows)
+        with db_transaction.atomic():
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch)
+            if self.errors:
+                db_transaction.set_rollback(True)
+                self.created = 0
+        self.errors.sort(key=lambda error: error['row'])
+        return self.created, self.errors
+
+    def _import_batch(self, batch):
+        valid = []
+        for row_number, row in batch:
+            if row is None:
+                self.errors.append({'row': row_number, 'errors': {'non_field_errors': ['Malformed row.']}})
+                continue
+            serializer = TransactionImportSerializer(data=row, context=self._context)
+            if serializer.is_valid():
+                valid.append((row_number, serializer.validated_data))
+            else:
+                self.errors.append({'row': row_number, 'errors': serializer.errors})
+
+        if not valid:
+            return
+
+        # One query per rule for the whole batch instead of one per row.
+        existing_vouchers = set(
+            Transaction.objects.filter(
+                system_voucher_no__in=[data['system_voucher_no'] for _, data in valid]
+            ).values_list('system_voucher_no', flat=True)
+        )
+        existing_bank_trans_ids = set(
+            Transaction.objects.filter(
+                bank_trans_id__in=[data['bank_trans_id'] for _, data in valid]
+            ).values_list('bank_id', 'bank_trans_id')
+        )
+
+        objects = []
+        for row_number, data in valid:
+            voucher_no = data['system_voucher_no']
+            bank_trans_key = (data['bank'].pk, data['bank_trans_id'])
+            row_errors = {}
+            if voucher_no in existing_vouchers or voucher_no in self._seen_vouchers:
+                row_errors['system_voucher_no'] = ['transaction with this system voucher no already exists.']
+            if bank_trans_key in existing_bank_trans_ids or bank_trans_key in self._seen_bank_trans_ids:
+                row_errors['bank_trans_id'] = ['A transaction with this bank and bank trans id already exists.']
+            self._seen_vouchers.add(voucher_no)
+            self._seen_bank_trans_ids.add(bank_trans_key)
+            if row_errors:
+                self.errors.append({'row': row_number, 'errors': row_errors})
+                continue
+            obj = Transaction(created_by_id=self.user.pk, **data)
+            obj.fingerprint = obj.compute_fingerprint()
+            objects.append((row_number, obj))
+
+        if not self.allow_duplicates:
+            objects = self._drop_duplicates(objects)
+
+        failures = transaction_validator.validate_many(obj for _, obj in objects)
+        for index, row_errors in failures:
+            self.errors.append({
+                'row': objects[index][0],
+                'errors': {field: [str(message)] for field, message in row_errors.items()},
+            })
+        objects = [obj for _, obj in objects]
+
+        if objects and not self.errors:
+            Transaction.objects.bulk_create(objects, batch_size=self.batch_size)
+            summaries.record_created(objects)
+            dashboard.invalidate()
+            self.created += len(objects)
+
+    def _drop_duplicates(self, objects):
+        """
+        Report rows whose fingerprint matches a stored transaction or an
+        earlier row, unless their bank transaction ids differ (see
+        Transaction.may_be_same_deposit()), with one indexed query for the
+        batch.
+        """
+        existing = {}
+        for fingerprint, pk, bank_trans_id in (
+            Transaction.objects.filter(fingerprint__in=[obj.fingerprint for _, obj in objects])
+            .order_by('pk').values_list('fingerprint', 'pk', 'bank_trans_id')
+        ):
+            existing.setdefault(fingerprint, []).append((pk, bank_trans_id))
+
+        def first_match(candidates, bank_trans_id):
+            return next(
+                (key for key, other in candidates if Transaction.may_be_same_deposit(bank_trans_id, other)), None
+            )
+
+        kept = []
+        for row_number, obj in objects:
+            seen = self._seen_fingerprints.setdefault(obj.fingerprint, [])
+            duplicate = first_match(existing.get(obj.fingerprint, ()), obj.bank_trans_id)
+            if duplicate is not None:
+                message = f'Likely duplicate of transaction {duplicate}.'
+            elif (duplicate := first_match(seen, obj.bank_trans_id)) is not None:
+                message = f'Likely duplicate of row {duplicate}.'
+            else:
+                seen.append((row_number, obj.bank_trans_id))
+                kept.append((row_number, obj))
+                continue
+            self.errors.append({'row': row_number, 'errors': {'non_field_errors': [message]}})
+        return kept
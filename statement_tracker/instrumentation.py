@@ -0,0 +1,330 @@
+import cProfile
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+# Other methods are labelled "other", so clients cannot grow the registry.
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+        yield '+Inf', self.count
+
+
+class ViewStats:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.duplicate_queries = 0
+        self.response_bytes = 0
+        self.statuses = Counter()
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class MetricsRegistry:
+    """
+    In-process request metrics, keyed by (view, method). Every worker process
+    keeps its own registry, so scrape each one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, method, status, duration, db_seconds, queries, duplicates, size):
+        with self._lock:
+            stats = self._views.get((view, method))
+            if stats is None:
+                stats = self._views[(view, method)] = ViewStats()
+            stats.duration.observe(duration)
+            stats.queries.observe(queries)
+            stats.db_seconds += db_seconds
+            stats.duplicate_queries += duplicates
+            stats.response_bytes += size
+            stats.statuses[status] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def histogram(name, help_text, attribute):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), stats in views:
+                    labels = f'view="{_label(view)}",method="{method}"'
+                    data = getattr(stats, attribute)
+                    for bound, count in data.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {data.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {data.count}')
+
+            def counter(name, help_text, attribute):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (view, method), stats in views:
+                    labels = f'view="{_label(view)}",method="{method}"'
+                    lines.append(f'{name}{{{labels}}} {getattr(stats, attribute)}')
+
+            lines.append('# HELP http_requests_total Requests by view, method and response status.')
+            lines.append('# TYPE http_requests_total counter')
+            for (view, method), stats in views:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+                    )
+            histogram('http_request_duration_seconds', 'Wall time of the request.', 'duration')
+            histogram('http_request_queries', 'Database queries per request.', 'queries')
+            counter('http_request_db_seconds_total', 'Time spent in database queries.', 'db_seconds')
+            counter('http_request_duplicate_queries_total', 'Queries repeated with identical SQL and parameters.',
+                    'duplicate_queries')
+            counter('http_response_bytes_total', 'Response body bytes.', 'response_bytes')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts, times and spots repeated queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duplicates = 0
+        self._seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            key = (sql, repr(params))
+            if key in self._seen:
+                self.duplicates += 1
+            else:
+                self._seen.add(key)
+
+
+def view_name(request):
+    """``TransactionViewSet.list``-style name of the view that served ``request``."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if view_class is None:
+        return match.func.__name__
+    method = request.method.lower() if request.method in METHODS else 'other'
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+def should_profile(request):
+    """
+    Profile when the server samples this request, or when profiling is
+    enabled and the client asked for it with an ``X-Profile: 1`` header.
+    """
+    rate = getattr(settings, 'INSTRUMENTATION_PROFILE_SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        return True
+    return bool(
+        getattr(settings, 'INSTRUMENTATION_PROFILING', False)
+        and request.META.get(PROFILE_HEADER) in ('1', 'true')
+    )
+
+
+def shows_server_timing(request):
+    """
+    Whether the response gets a Server-Timing header: for staff, as
+    authenticated by the view, or for everyone when DEBUG is on.
+    """
+    return settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False)
+
+
+def save_profile(profiler, view):
+    directory = Path(getattr(settings, 'INSTRUMENTATION_PROFILE_DIR', 'profiles'))
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{time.strftime("%Y%m%d-%H%M%S")}-{re.sub(r"[^A-Za-z0-9_.]", "_", view)}-{random.getrandbits(32):08x}.prof'
+    profiler.dump_stats(path)
+    return path.name
+
+
+def _install_recorder(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class RecordedStream:
+    """
+    The body of a streaming response, passed through while counting its
+    bytes and the queries run to produce it. ``on_close(size)`` is called
+    once, when the server closes the response.
+    """
+
+    def __init__(self, content, recorder, on_close):
+        self.content = content
+        self.recorder = recorder
+        self.on_close = on_close
+        self.size = 0
+        self._stack = None
+
+    def close(self):
+        # Django calls this from the thread that iterated a sync body, and
+        # from the thread sensitive worker for an async one.
+        if self._stack is not None:
+            self._stack.close()
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close(self.size)
+
+
+class SyncRecordedStream(RecordedStream):
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stack is None:
+            self._stack = ExitStack()
+            _install_recorder(self._stack, self.recorder)
+        chunk = next(self.content)
+        self.size += len(chunk)
+        return chunk
+
+
+class AsyncRecordedStream(RecordedStream):
+    # No __iter__: Django tells sync bodies from async ones by trying iter().
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._stack is None:
+            # Where the async ORM runs its queries, as in __acall__.
+            self._stack = ExitStack()
+            await sync_to_async(_install_recorder)(self._stack, self.recorder)
+        chunk = await anext(self.content)
+        self.size += len(chunk)
+        return chunk
+
+
+class InstrumentationMiddleware:
+    """
+    Times each request, counts its queries and repeated queries, and records
+    the result per view in ``registry``. Staff, and everyone when DEBUG is
+    on, also get the numbers in a ``Server-Timing`` header. Profiled requests write a cProfile dump to
+    INSTRUMENTATION_PROFILE_DIR, named in the ``X-Profile`` response header.
+    Put it first in MIDDLEWARE so the timing covers the other middleware.
+
+    Under ASGI the query wrapper is installed in the request's thread
+    sensitive worker thread, where both sync views and the async ORM run
+    their queries. Profiling is only done for synchronous requests.
+
+    A streaming response is recorded when it is closed, with its body size
+    and the queries run while streaming it. Its Server-Timing header goes
+    out before the body, so it covers only the work done up to then.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile() if should_profile(request) else None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _install_recorder(stack, recorder)
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        return self.finish(request, response, recorder, started, profiler)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        await sync_to_async(_install_recorder)(stack, recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, started)
+
+    def finish(self, request, response, recorder, started, profiler=None):
+        duration = time.perf_counter() - started
+        view = view_name(request)
+        method = request.method if request.method in METHODS else 'other'
+
+        def record(size, duration=duration):
+            registry.record(
+                view, method, response.status_code, duration,
+                recorder.duration, recorder.count, recorder.duplicates, size,
+            )
+
+        if response.streaming:
+            stream_class = AsyncRecordedStream if response.is_async else SyncRecordedStream
+            response.streaming_content = stream_class(
+                response.streaming_content, recorder,
+                lambda size: record(size, time.perf_counter() - started),
+            )
+        else:
+            record(len(response.content))
+        if shows_server_timing(request):
+            response['Server-Timing'] = (
+                f'app;dur={duration * 1000:.1f}, '
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries, '
+                f'{recorder.duplicates} duplicate"'
+            )
+        if profiler is not None:
+            response['X-Profile'] = save_profile(profiler, view)
+        return response
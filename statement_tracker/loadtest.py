@@ -0,0 +1,140 @@
+"""
+A small asyncio HTTP/1.1 keep-alive client for the load-test commands.
+
+It uses only the standard library, so load tests need nothing beyond the
+project's requirements. Plain http:// only.
+"""
+import asyncio
+import json
+import re
+import statistics
+import time
+from collections import Counter
+
+SERVER_TIMING_QUERIES_RE = re.compile(r'(\d+) queries')
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def server_queries(headers):
+    """Query count from InstrumentationMiddleware's Server-Timing header, or None."""
+    match = SERVER_TIMING_QUERIES_RE.search(headers.get('server-timing', ''))
+    return int(match.group(1)) if match else None
+
+
+class Result:
+    """Latencies, statuses and query counts of one load run."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.latencies = []
+        self.queries = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        summary = {
+            'requests': len(latencies) + self.errors,
+            'ok': len(latencies),
+            'errors': self.errors,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput_rps': round(len(latencies) / self.elapsed, 1) if self.elapsed else 0.0,
+        }
+        if latencies:
+            summary.update({
+                'mean_ms': round(statistics.fmean(latencies), 2),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'max_ms': round(latencies[-1], 2),
+            })
+        if self.queries:
+            summary.update({
+                'queries_mean': round(statistics.fmean(self.queries), 2),
+                'queries_max': max(self.queries),
+            })
+        return summary
+
+
+def encode_request(host, port, method, path, headers=None, body=None):
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Accept: application/json']
+    if body is not None:
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+            lines.append('Content-Type: application/json')
+        lines.append(f'Content-Length: {len(body)}')
+    lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+    return '\r\n'.join(lines).encode() + b'\r\n\r\n' + (body or b'')
+
+
+async def run(host, port, build_request, concurrency, total, ok_statuses=(200,)):
+    """
+    Send ``total`` requests over ``concurrency`` keep-alive connections.
+    ``build_request(n)`` returns the encoded n-th request, so requests can
+    differ, e.g. create a new object each time. Responses with a status not
+    in ``ok_statuses`` count as errors.
+    """
+    result = Result()
+    counter = iter(range(total))
+
+    async def client():
+        reader = writer = None
+        for number in counter:
+            request = build_request(number)
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                status, headers, _ = await read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                result.errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+            result.statuses[status] += 1
+            if status not in ok_statuses:
+                result.errors += 1
+                continue
+            result.latencies.append((time.perf_counter() - started) * 1000)
+            queries = server_queries(headers)
+            if queries is not None:
+                result.queries.append(queries)
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(max(1, min(concurrency, total)))))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns ``(status, headers, body)``."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(
+        (name.strip().lower(), value.strip())
+        for name, _, value in (line.partition(':') for line in lines[1:] if line)
+    )
+    if headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                break
+        body = b''.join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from statement_tracker.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute the duplicate-detection fingerprint of every transaction and '
+        'list the groups that share one. Rows are read in (bank, deposit date, '
+        'amount) order, so only one group of candidates is held at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = clusters = 0
+        changed = []
+        # fingerprint -> pks, for the current (bank, date, amount) run.
+        run_key, run = None, {}
+
+        queryset = (
+            Transaction.objects.only('pk', 'fingerprint', 'bank_id', *Transaction.FINGERPRINT_FIELDS[1:])
+            .order_by('bank_id', 'bank_deposit_date', 'voucher_amount', 'pk')
+        )
+        for transaction in queryset.iterator(chunk_size=batch_size):
+            key = (transaction.bank_id, transaction.bank_deposit_date, transaction.voucher_amount)
+            if key != run_key:
+                clusters += self.report(run)
+                run_key, run = key, {}
+
+            fingerprint = transaction.compute_fingerprint()
+            run.setdefault(fingerprint, []).append(transaction.pk)
+            if fingerprint != transaction.fingerprint:
+                transaction.fingerprint = fingerprint
+                changed.append(transaction)
+            if len(changed) >= batch_size:
+                Transaction.objects.bulk_update(changed, ['fingerprint'])
+                updated += len(changed)
+                changed = []
+        clusters += self.report(run)
+        if changed:
+            Transaction.objects.bulk_update(changed, ['fingerprint'])
+            updated += len(changed)
+
+        self.stdout.write(f'Updated {updated} fingerprints; {clusters} groups of likely duplicates.')
+
+    def report(self, run):
+        found = 0
+        for pks in run.values():
+            if len(pks) > 1:
+                found += 1
+                self.stdout.write(f'Likely duplicates: {", ".join(map(str, pks))}')
+        return found
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import uuid
+from datetime import date
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from statement_tracker import loadtest
+from statement_tracker.authentication import UserClaimsRefreshToken
+from statement_tracker.models import Bank, Transaction, User
+
+SCENARIOS = (
+    'login', 'bank-list', 'transaction-list', 'transaction-create', 'transaction-verify', 'transaction-reconcile',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load the main API endpoints of a running server (login, bank list, '
+        'transaction list, create, verify and reconcile) with concurrent '
+        'keep-alive clients. Reports throughput, p50/p95/p99 latency and '
+        'database queries per request, the last read from the Server-Timing '
+        'header. Creates, verifies and reconciles transactions: use a benchmark '
+        'database, e.g. one filled by seed_ledger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent connections.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario.')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS, dest='scenarios',
+            help='Run only this scenario; repeat for several. Default: all.'
+        )
+        parser.add_argument('--user', help='Email of the staff user; defaults to the first staff user.')
+        parser.add_argument(
+            '--password', default='bench-password',
+            help="The user's password, for the login scenario (seed_ledger's default)."
+        )
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='JSON file of an earlier run to compare against.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only plain http:// servers are supported.')
+        users = User.objects.filter(is_staff=True, is_active=True)
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No active staff user to run as.')
+        bank = Bank.objects.order_by('pk').first()
+        if bank is None:
+            raise CommandError('No banks; run seed_ledger first.')
+        previous = self.load(options['compare']) if options['compare'] else None
+
+        self.host, self.port, self.base = url.hostname, url.port or 80, url.path.rstrip('/')
+        self.token = str(UserClaimsRefreshToken.for_user(user).access_token)
+        self.user, self.bank, self.password = user, bank, options['password']
+        self.run_id = uuid.uuid4().hex[:8]
+        concurrency, total = options['concurrency'], options['requests']
+
+        document = {
+            'started': timezone.now().isoformat(),
+            'url': options['url'],
+            'concurrency': concurrency,
+            'requests': total,
+            'environment': self.environment(),
+            'scenarios': {},
+        }
+        self.stdout.write(
+            f'{total} requests per scenario, {concurrency} connections, as {user.email}; '
+            f'{document["environment"]["transactions"]} transactions\n'
+        )
+        results = document['scenarios']
+        for scenario in options['scenarios'] or SCENARIOS:
+            build_request, count, ok_statuses = getattr(self, 'scenario_' + scenario.replace('-', '_'))(total)
+            if not count:
+                self.stdout.write(self.style.WARNING(f'{scenario:<22} skipped: nothing to run it on'))
+                continue
+            result = asyncio.run(loadtest.run(self.host, self.port, build_request, concurrency, count, ok_statuses))
+            results[scenario] = summary = result.summary()
+            self.report(scenario, summary, previous and previous['scenarios'].get(scenario))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(document, indent=2) + '\n')
+            self.stdout.write(f'\nResults written to {options["output"]}')
+
+    def request(self, method, path, body=None, authenticate=True):
+        headers = {'Authorization': f'Bearer {self.token}'} if authenticate else None
+        return loadtest.encode_request(self.host, self.port, method, self.base + path, headers, body)
+
+    def scenario_login(self, total):
+        if not self.user.check_password(self.password):
+            self.stdout.write(self.style.WARNING(f'login: wrong --password for {self.user.email}'))
+            return None, 0, ()
+        request = self.request(
+            'POST', '/api/auth/login/', {'email': self.user.email, 'password': self.password}, authenticate=False,
+        )
+        return (lambda n: request), total, (200,)
+
+    def scenario_bank_list(self, total):
+        request = self.request('GET', '/api/banks/')
+        return (lambda n: request), total, (200,)
+
+    def scenario_transaction_list(self, total):
+        request = self.request('GET', '/api/transactions/')
+        return (lambda n: request), total, (200,)
+
+    def scenario_transaction_create(self, total):
+        today = date.today().isoformat()
+        rng = random.Random(self.run_id)
+        amounts = [f'{rng.randint(50000, 50000000) / 100:.2f}' for _ in range(total)]
+
+        def build(n):
+            number = f'LT-{self.run_id}-{n}'
+            return self.request('POST', '/api/transactions/', {
+                'bank': self.bank.pk, 'bank_account_no': 'LOAD-001', 'bank_trans_id': number,
+                'bank_deposit_date': today, 'transaction_detail': f'Load test deposit {number}',
+                'system_voucher_no': number, 'system_value_date': today, 'voucher_amount': amounts[n],
+                'cheque_no': number, 'source': 'Cheque',
+            })
+        return build, total, (201,)
+
+    def scenario_transaction_verify(self, total):
+        ids = list(
+            Transaction.objects.filter(is_verified=False).order_by('-pk').values_list('pk', flat=True)[:total]
+        )
+        return (lambda n: self.request('POST', f'/api/transactions/{ids[n]}/verify/')), len(ids), (200,)
+
+    def scenario_transaction_reconcile(self, total):
+        ids = list(
+            Transaction.objects.filter(status__in=('Pending', 'Completed'))
+            .order_by('-pk').values_list('pk', flat=True)[:total]
+        )
+        return (lambda n: self.request('POST', f'/api/transactions/{ids[n]}/reconcile/')), len(ids), (200,)
+
+    def report(self, scenario, summary, previous=None):
+        if not summary['ok']:
+            self.stdout.write(
+                f'{scenario:<22} no successful requests, {summary["errors"]} errors {summary["statuses"]}'
+            )
+            return
+        queries = f'{summary["queries_mean"]:5.1f}' if 'queries_mean' in summary else '    -'
+        line = (
+            f'{scenario:<22} {summary["throughput_rps"]:8.1f} req/s  p50 {summary["p50_ms"]:7.2f}  '
+            f'p95 {summary["p95_ms"]:7.2f}  p99 {summary["p99_ms"]:7.2f} ms  queries {queries}  '
+            f'errors {summary["errors"]}'
+        )
+        if previous and previous.get('ok'):
+            line += (
+                f'  (req/s {change(summary["throughput_rps"], previous["throughput_rps"])}, '
+                f'p99 {change(summary["p99_ms"], previous["p99_ms"])})'
+            )
+        self.stdout.write(line)
+
+    def load(self, path):
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def environment(self):
+        try:
+            revision = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            revision = None
+        return {
+            'revision': revision,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'transactions': Transaction.objects.count(),
+        }
+
+
+def change(current, previous):
+    if not previous:
+        return 'n/a'
+    return f'{(current - previous) / previous * 100:+.1f}%'
@@ -0,0 +1,68 @@
+import asyncio
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from statement_tracker import loadtest
+from statement_tracker.authentication import UserClaimsRefreshToken
+from statement_tracker.models import User
+
+ENDPOINTS = (
+    ('transactions list', '/api/transactions/', '/api/async/transactions/'),
+    ('banks list', '/api/banks/', '/api/async/banks/'),
+    ('current user', '/api/users/me/', '/api/async/users/me/'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load the synchronous read endpoints and their /api/async/ counterparts '
+        'of a running server with many concurrent keep-alive clients, and report '
+        'throughput and latency percentiles. Serve the project under ASGI first, '
+        'e.g. "uvicorn rjbcl.asgi:application --workers 4".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server.')
+        parser.add_argument('--concurrency', type=int, default=500, help='Concurrent connections.')
+        parser.add_argument('--requests', type=int, default=10000, help='Requests per endpoint.')
+        parser.add_argument(
+            '--user', help='Username to mint the access token for; defaults to the first staff user.'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only plain http:// servers are supported.')
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_staff=True, is_active=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to authenticate as.')
+        token = str(UserClaimsRefreshToken.for_user(user).access_token)
+
+        self.stdout.write(
+            f'{options["requests"]} requests per endpoint, {options["concurrency"]} connections, '
+            f'as {user.username}\n'
+        )
+        base = url.path.rstrip('/')
+        port = url.port or 80
+        headers = {'Authorization': f'Bearer {token}'}
+        for label, sync_path, async_path in ENDPOINTS:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+            for name, path in (('sync', sync_path), ('async', async_path)):
+                request = loadtest.encode_request(url.hostname, port, 'GET', base + path, headers)
+                result = asyncio.run(loadtest.run(
+                    url.hostname, port, lambda n: request, options['concurrency'], options['requests'],
+                ))
+                self.report(name, result.summary())
+
+    def report(self, label, summary):
+        if not summary['ok']:
+            self.stdout.write(f'{label:<6} no successful requests, {summary["errors"]} errors')
+            return
+        self.stdout.write(
+            f'{label:<6} {summary["throughput_rps"]:9.1f} req/s  '
+            f'p50 {summary["p50_ms"]:8.2f} ms  p99 {summary["p99_ms"]:8.2f} ms  errors {summary["errors"]}'
+        )
@@ -0,0 +1,90 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from statement_tracker import search, synthetic
+from statement_tracker.models import Bank, Transaction, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Show query plans and timings for the Transaction access paths with and '
+        'without the Transaction Meta.indexes. The indexes are dropped inside a '
+        'transaction that is rolled back, so run it against a benchmark database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Insert this many synthetic transactions first, e.g. 1000000.'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        user = User.objects.order_by('pk').first()
+        bank = Bank.objects.order_by('pk').first()
+        if user is None or bank is None:
+            raise CommandError('No data to benchmark; pass --seed.')
+
+        today = timezone.now().date()
+        queries = [
+            ('Teller list page', lambda: Transaction.objects.filter(created_by=user)
+                .order_by('-created_date', 'id')[:51]),
+            ('Staff list page', lambda: Transaction.objects.order_by('-created_date', 'id')[:51]),
+            ('Bank deposits in a month', lambda: Transaction.objects.filter(
+                bank=bank, bank_deposit_date__range=(today - timedelta(days=30), today))
+                .order_by('bank_deposit_date')[:500]),
+            ('Pending by value date', lambda: Transaction.objects.filter(
+                status='Pending', system_value_date__range=(today - timedelta(days=30), today))
+                .order_by('system_value_date')[:500]),
+            ('Unreconciled for a bank', lambda: Transaction.objects.filter(bank=bank)
+                .exclude(status='Reconciled').order_by('bank_deposit_date')[:500]),
+            ('Unverified backlog', lambda: Transaction.objects.filter(is_verified=False)
+                .order_by('created_date')[:500]),
+        ]
+
+        total = Transaction.objects.count()
+        self.stdout.write(f'{total} transactions on {connection.vendor}\n')
+        for label, build in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+            self.report('with indexes', build, options['repeat'])
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index in Transaction._meta.indexes:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                self.report('without indexes', build, options['repeat'])
+                transaction.set_rollback(True)
+
+    def report(self, label, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f'{label:<16} median {statistics.median(timings):9.2f} ms')
+        # Not QuerySet.explain(): SQLite reuses the cached EXPLAIN statement
+        # after DROP INDEX, so the label keeps the SQL text distinct.
+        sql, params = build().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} -- {label}', params)
+            for row in cursor.fetchall():
+                self.stdout.write('    ' + ' '.join(str(column) for column in row))
+
+    def seed(self, count):
+        users = synthetic.ensure_users(20, 'bench-password')
+        banks = synthetic.ensure_banks(5)
+        with search.bulk_load(connection):
+            synthetic.generate_transactions(
+                count, users, banks,
+                progress=lambda done: self.stdout.write(f'seeded {done}/{count}', ending='\r'),
+            )
+        self.stdout.write('')
@@ -0,0 +1,71 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from statement_tracker.matching import LedgerEntry, StatementLine, StatementMatcher
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the statement matching engine on a synthetic in-memory ledger. '
+        'No database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ledger', type=int, default=1000000, help='Ledger entries.')
+        parser.add_argument('--lines', type=int, default=100000, help='Statement lines.')
+        parser.add_argument('--banks', type=int, default=20)
+        parser.add_argument('--date-tolerance', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start_day = date(2024, 1, 1)
+
+        started = time.perf_counter()
+        entries = []
+        for pk in range(1, options['ledger'] + 1):
+            amount = Decimal(rng.randint(100, 2000000)) / 100
+            entries.append(LedgerEntry(
+                pk, rng.randint(1, options['banks']), f'ACC-{pk % 50}',
+                f'BT{pk}' if pk % 3 else None, f'CHQ{pk}' if pk % 5 == 0 else None,
+                frozenset([amount]), start_day + timedelta(days=rng.randint(0, 730)),
+            ))
+
+        # A realistic mix: lines carrying the bank's transaction id, cheque
+        # lines, lines with only amount and a shifted date, and noise.
+        lines = []
+        for row, entry in enumerate(rng.sample(entries, options['lines']), start=1):
+            amount = next(iter(entry.amounts))
+            kind = rng.random()
+            if kind < 0.5 and entry.bank_trans_id:
+                lines.append(StatementLine(row, entry.bank_id, entry.bank_account_no,
+                                           entry.bank_trans_id, '', amount, entry.deposit_date))
+            elif kind < 0.6 and entry.cheque_no:
+                lines.append(StatementLine(row, entry.bank_id, '', '', entry.cheque_no,
+                                           amount, entry.deposit_date))
+            elif kind < 0.95:
+                shifted = entry.deposit_date + timedelta(days=rng.randint(-2, 2))
+                lines.append(StatementLine(row, entry.bank_id, entry.bank_account_no, '', '', amount, shifted))
+            else:
+                lines.append(StatementLine(row, entry.bank_id, '', '', '', Decimal('0.01'), entry.deposit_date))
+        generated = time.perf_counter()
+
+        matcher = StatementMatcher(entries, options['date_tolerance'])
+        indexed = time.perf_counter()
+        result = matcher.match(lines)
+        finished = time.perf_counter()
+
+        self.stdout.write(f'generated {len(entries)} entries, {len(lines)} lines in {generated - started:.2f}s')
+        self.stdout.write(f'index build  {indexed - generated:8.2f}s')
+        self.stdout.write(
+            f'match        {finished - indexed:8.2f}s  '
+            f'({len(lines) / (finished - indexed):,.0f} lines/s)'
+        )
+        self.stdout.write(
+            f'matched {len(result.matched)}, ambiguous {len(result.ambiguous)}, '
+            f'unmatched {len(result.unmatched)}'
+        )
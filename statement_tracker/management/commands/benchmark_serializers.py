@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from statement_tracker.serializers import TransactionListSerializer, TransactionSerializer
+from statement_tracker.viewsets import TransactionViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows/s of TransactionSerializer on model instances with '
+        'TransactionListSerializer on values() rows, for the same transactions, '
+        'serialization alone and with the query. Checks that both render the '
+        'same JSON. Fill the database first, e.g. with seed_ledger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Transactions per run.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per variant.')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/transactions/'))
+        context = {'request': request}
+        rows = options['rows']
+        instances = TransactionViewSet.queryset.order_by('-created_date', 'id')[:rows]
+        values = (
+            TransactionViewSet.queryset.order_by('-created_date', 'id')
+            .values(*TransactionListSerializer.row_lookups())[:rows]
+        )
+        fetched_instances, fetched_values = list(instances), list(values)
+        if not fetched_instances:
+            raise CommandError('No transactions; run seed_ledger first.')
+
+        def model_serializer(objects):
+            return TransactionSerializer(objects, many=True, context=context).data
+
+        def row_serializer(objects):
+            return TransactionListSerializer(objects, many=True, context=context).data
+
+        renderer = JSONRenderer()
+        if renderer.render(model_serializer(fetched_instances)) != renderer.render(row_serializer(fetched_values)):
+            raise CommandError('The two serializers rendered different JSON.')
+
+        count = len(fetched_instances)
+        self.stdout.write(f'{count} transactions, median of {options["repeat"]} runs; output identical\n')
+        for label, run in (
+            ('ModelSerializer, serialize', lambda: model_serializer(fetched_instances)),
+            ('Row serializer, serialize', lambda: row_serializer(fetched_values)),
+            ('ModelSerializer, query + serialize', lambda: model_serializer(list(instances.all()))),
+            ('Row serializer, query + serialize', lambda: row_serializer(list(values.all()))),
+        ):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            self.stdout.write(f'{label:<36} {count / median:10.0f} rows/s  {median * 1000:9.2f} ms')
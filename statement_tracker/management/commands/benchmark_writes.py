@@ -0,0 +1,96 @@
+import statistics
+import threading
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+
+from statement_tracker.models import Bank, Transaction, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure Transaction write throughput with several concurrent writers, '
+        'each on its own database connection, against the configured database '
+        'profile (run it once with DB_ENGINE=postgresql and once without). The '
+        'rows written are deleted afterwards; use a benchmark database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--writes', type=int, default=200, help='Transactions created per writer.')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username='bench_writer').first()
+        if user is None:
+            user = User(email='bench_writer@example.com', username='bench_writer', full_name='Bench Writer')
+            user.set_unusable_password()
+            user.save()
+        bank, _ = Bank.objects.get_or_create(name='Bench Bank 0', defaults={'account_no': '000'})
+        run = uuid.uuid4().hex[:8]
+
+        self.stdout.write(f'{connection.vendor}: {self.describe()}')
+        self.stdout.write(f'{options["writers"]} writers x {options["writes"]} transactions\n')
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def writer(number):
+            try:
+                for i in range(options['writes']):
+                    started = time.perf_counter()
+                    try:
+                        Transaction.objects.create(
+                            created_by=user,
+                            bank=bank,
+                            bank_account_no='BENCH-001',
+                            bank_trans_id=f'BW-{run}-{number}-{i}',
+                            bank_deposit_date=date.today(),
+                            transaction_detail='Synthetic benchmark deposit',
+                            system_voucher_no=f'BW-{run}-{number}-{i}',
+                            system_value_date=date.today(),
+                            voucher_amount=100,
+                        )
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    with lock:
+                        latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+
+        close_old_connections()
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if latencies:
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f'{len(latencies) / elapsed:9.1f} writes/s  p50 {statistics.median(latencies):8.2f} ms  '
+                f'p99 {p99:8.2f} ms  errors {len(errors)}'
+            )
+        for message in sorted(set(errors)):
+            self.stdout.write(self.style.WARNING(f'{errors.count(message)} x {message}'))
+
+        # Deleted one by one so the daily summaries are corrected by the signals.
+        for transaction in Transaction.objects.filter(bank_trans_id__startswith=f'BW-{run}-'):
+            transaction.delete()
+
+    def describe(self):
+        settings = connection.settings_dict
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = []
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    pragmas.append(f'{pragma}={cursor.fetchone()[0]}')
+            return ', '.join(pragmas)
+        return f'CONN_MAX_AGE={settings["CONN_MAX_AGE"]}, CONN_HEALTH_CHECKS={settings["CONN_HEALTH_CHECKS"]}'
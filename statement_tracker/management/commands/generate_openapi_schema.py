@@ -0,0 +1,34 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from statement_tracker.schema import schema_dir, schema_path, spec_extension
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the OpenAPI schema served at /swagger.json, /swagger.yaml and by the '
+        'UIs to OPENAPI_SCHEMA_DIR. Run once per deploy; the files are named after '
+        'the source fingerprint, so stale ones are never served.'
+    )
+
+    def handle(self, *args, **options):
+        schema_view = import_module(settings.ROOT_URLCONF).schema_view
+        directory = schema_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        written = set()
+        for renderer_class in schema_view.renderer_classes:
+            extension = spec_extension(renderer_class.format)
+            if extension is None or extension in written:
+                continue
+            path = schema_path(extension)
+            path.write_bytes(schema_view.render_spec(renderer_class()))
+            written.add(extension)
+            self.stdout.write(f'wrote {path}')
+
+        for path in directory.glob('openapi-*.*'):
+            if path.suffix[1:] in written and path != schema_path(path.suffix[1:]):
+                path.unlink()
+                self.stdout.write(f'removed stale {path}')
@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from statement_tracker.images import rendition_name, store_voucher_image
+from statement_tracker.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the renditions of voucher images uploaded before the image '
+        'pipeline, storing each under its content hash. The old files are left '
+        'in place.'
+    )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        queryset = Transaction.objects.exclude(voucher_image='').exclude(voucher_image__isnull=True)
+        for transaction in queryset.only('pk', 'voucher_image').iterator(chunk_size=500):
+            image = transaction.voucher_image
+            if image.storage.exists(rendition_name(image.name, 'thumbnail')):
+                continue
+            old_name = image.name
+            try:
+                image._committed = False
+                store_voucher_image(image)
+            except (OSError, ValidationError) as e:
+                failed += 1
+                self.stderr.write(f'Transaction {transaction.pk} ({old_name}): {e}')
+                continue
+            finally:
+                image.close()
+            Transaction.objects.filter(pk=transaction.pk).update(
+                voucher_image=image.name, updated_date=timezone.now(),
+            )
+            processed += 1
+        self.stdout.write(f'Processed {processed} voucher images, {failed} failed.')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from statement_tracker import summaries
+
+
+class Command(BaseCommand):
+    help = 'Recreate the DailySummary table from the Transaction table.'
+
+    def handle(self, *args, **options):
+        count = summaries.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily summary rows.'))
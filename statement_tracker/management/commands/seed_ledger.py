@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from statement_tracker import dashboard, search, summaries, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic users, banks and transactions for '
+        'load tests. The same --seed on an empty database gives the same data. '
+        'Users are named bench_0, bench_1... and the first --staff of them are '
+        'staff. Use a benchmark database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=100000, help='Transactions to add, e.g. 2000000.')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--staff', type=int, default=5, help='How many of the users are staff.')
+        parser.add_argument('--banks', type=int, default=20)
+        parser.add_argument('--password', default='bench-password', help='Password of every synthetic user.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = synthetic.ensure_users(options['users'], options['password'], options['staff'])
+        banks = synthetic.ensure_banks(options['banks'])
+        total = options['transactions']
+        # The search index is rebuilt once at the end rather than per row.
+        with search.bulk_load(connection):
+            created = synthetic.generate_transactions(
+                total, users, banks, random.Random(options['seed']), options['batch_size'],
+                progress=lambda done: self.stdout.write(f'inserted {done}/{total}', ending='\r'),
+            )
+            self.stdout.write('')
+            inserted = time.perf_counter()
+
+        rows = summaries.rebuild()
+        dashboard.invalidate()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        finished = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} users, {len(banks)} banks, {created} transactions in '
+            f'{inserted - started:.1f}s ({created / max(inserted - started, 1e-9):.0f}/s); '
+            f'search index and {rows} daily summary rows rebuilt in {finished - inserted:.1f}s.'
+        ))
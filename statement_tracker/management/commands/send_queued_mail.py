@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from statement_tracker import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver queued emails from the outbox in batches, one backend connection '
+        'per batch, retrying failures with exponential backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting once it is drained.',
+        )
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                sent, retried, failed = outbox.deliver_batch(options['batch_size'])
+                if sent or retried or failed:
+                    self.stdout.write(f'sent {sent}, will retry {retried}, failed {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
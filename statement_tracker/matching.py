@@ -0,0 +1,173 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from operator import attrgetter
+from typing import NamedTuple
+
+from .models import Transaction
+
+DEFAULT_DATE_TOLERANCE = 3
+
+_deposit_date = attrgetter('deposit_date')
+
+
+class StatementLine(NamedTuple):
+    row: int
+    bank_id: int
+    bank_account_no: str
+    bank_trans_id: str
+    cheque_no: str
+    amount: object
+    date: object
+
+
+class LedgerEntry(NamedTuple):
+    id: int
+    bank_id: int
+    bank_account_no: str
+    bank_trans_id: str
+    cheque_no: str
+    amounts: frozenset
+    deposit_date: object
+
+
+class MatchResult(NamedTuple):
+    matched: list
+    ambiguous: list
+    unmatched: list
+
+    def as_dict(self):
+        return {
+            'matched': [
+                {'row': line.row, 'transaction': entry.id, 'rule': rule}
+                for line, entry, rule in self.matched
+            ],
+            'ambiguous': [
+                {'row': line.row, 'candidates': sorted(entry.id for entry in entries)}
+                for line, entries in self.ambiguous
+            ],
+            'unmatched': [line.row for line in self.unmatched],
+        }
+
+
+class StatementMatcher:
+    """
+    Matches bank statement lines to unreconciled ledger entries.
+
+    Exact identifiers (bank_trans_id, then cheque_no) are looked up in hash
+    indexes keyed by bank. Lines without an identifier hit are matched on
+    (bank, amount), the account number when the line has one, and a deposit
+    date within ``date_tolerance`` days, using a date-sorted list per key and
+    bisect for the window. Each ledger entry is matched at most once.
+    Building the indexes is one sort of the m entries, and matching n lines
+    is O(n log m).
+    """
+
+    def __init__(self, entries, date_tolerance=DEFAULT_DATE_TOLERANCE):
+        self.date_tolerance = date_tolerance
+        self.by_trans_id = defaultdict(list)
+        self.by_cheque_no = defaultdict(list)
+        # (bank_id, amount) -> entries in deposit date order, because the
+        # entries are walked in date order.
+        self.by_amount = defaultdict(list)
+
+        for entry in sorted(entries, key=_deposit_date):
+            if entry.bank_trans_id:
+                self.by_trans_id[(entry.bank_id, entry.bank_trans_id)].append(entry)
+            if entry.cheque_no:
+                self.by_cheque_no[(entry.bank_id, entry.cheque_no)].append(entry)
+            for amount in entry.amounts:
+                self.by_amount[(entry.bank_id, amount)].append(entry)
+
+    def match(self, lines):
+        used = set()
+        matched, ambiguous, pending = [], [], []
+
+        # Identifier matches first, so fuzzy candidates cannot steal them.
+        for line in lines:
+            result = self._match_identifier(line, used)
+            if result is None:
+                pending.append(line)
+            elif isinstance(result, list):
+                ambiguous.append((line, result))
+            else:
+                entry, rule = result
+                used.add(entry.id)
+                matched.append((line, entry, rule))
+
+        unmatched = []
+        for line in pending:
+            candidates = self._amount_candidates(line, used)
+            if len(candidates) == 1:
+                used.add(candidates[0].id)
+                matched.append((line, candidates[0], 'amount_date'))
+            elif candidates:
+                ambiguous.append((line, candidates))
+            else:
+                unmatched.append(line)
+
+        return MatchResult(matched, ambiguous, unmatched)
+
+    def _match_identifier(self, line, used):
+        for rule, index, value in (
+            ('bank_trans_id', self.by_trans_id, line.bank_trans_id),
+            ('cheque_no', self.by_cheque_no, line.cheque_no),
+        ):
+            if not value:
+                continue
+            hits = [entry for entry in index.get((line.bank_id, value), ()) if entry.id not in used]
+            if not hits:
+                continue
+            confirmed = [entry for entry in hits if line.amount in entry.amounts]
+            if len(confirmed) == 1:
+                return confirmed[0], rule
+            # Same identifier but no single amount agreement: needs a human.
+            return confirmed or hits
+        return None
+
+    def _amount_candidates(self, line, used):
+        key = (line.bank_id, line.amount)
+        if key not in self.by_amount:
+            return []
+        entries = self.by_amount[key]
+        tolerance = timedelta(days=self.date_tolerance)
+        start = bisect_left(entries, line.date - tolerance, key=_deposit_date)
+        end = bisect_right(entries, line.date + tolerance, key=_deposit_date)
+        return [
+            entry for entry in entries[start:end]
+            if entry.id not in used
+            and (not line.bank_account_no or entry.bank_account_no == line.bank_account_no)
+        ]
+
+
+def entry_amounts(voucher_amount, credit, debit):
+    return frozenset(amount for amount in (voucher_amount, credit, debit) if amount)
+
+
+def load_ledger(lines, date_tolerance=DEFAULT_DATE_TOLERANCE, queryset=None):
+    """
+    Load the unreconciled transactions that could match ``lines``: same banks,
+    deposit dates inside the statement's date range plus the tolerance.
+    """
+    if not lines:
+        return []
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    tolerance = timedelta(days=date_tolerance)
+    rows = queryset.filter(
+        bank_id__in={line.bank_id for line in lines},
+        bank_deposit_date__gte=min(line.date for line in lines) - tolerance,
+        bank_deposit_date__lte=max(line.date for line in lines) + tolerance,
+    ).exclude(status='Reconciled').order_by().values_list(
+        'id', 'bank_id', 'bank_account_no', 'bank_trans_id', 'cheque_no',
+        'voucher_amount', 'credit', 'debit', 'bank_deposit_date',
+    ).iterator(chunk_size=5000)
+    return [
+        LedgerEntry(pk, bank_id, account_no, trans_id, cheque_no,
+                    entry_amounts(voucher_amount, credit, debit), deposit_date)
+        for pk, bank_id, account_no, trans_id, cheque_no, voucher_amount, credit, debit, deposit_date in rows
+    ]
+
+
+def match_statement(lines, date_tolerance=DEFAULT_DATE_TOLERANCE, queryset=None):
+    entries = load_ledger(lines, date_tolerance, queryset)
+    return StatementMatcher(entries, date_tolerance).match(lines)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-17 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0002_bank_account_no'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_date', 'id'], name='txn_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_by', '-created_date', 'id'], name='txn_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['bank', 'bank_deposit_date'], name='txn_bank_deposit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'system_value_date'], name='txn_status_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'Reconciled'), _negated=True), fields=['bank', 'bank_deposit_date'], name='txn_unreconciled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['created_date'], name='txn_unverified_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0003_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='bank_trans_id',
+            field=models.CharField(db_index=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='cheque_no',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='policy_no',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
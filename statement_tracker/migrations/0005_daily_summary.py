@@ -0,0 +1,76 @@
+# Generated by Django 5.2 on 2026-10-17 17:44
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def build_daily_summary(apps, schema_editor):
+    Transaction = apps.get_model('statement_tracker', 'Transaction')
+    DailySummary = apps.get_model('statement_tracker', 'DailySummary')
+    zero = models.Value(Decimal(0))
+    rows = (
+        Transaction.objects.order_by()
+        .values('bank_id', 'bank_account_no', 'bank_deposit_date', 'source', 'status')
+        .annotate(
+            transaction_count=models.Count('id'),
+            credit_total=Coalesce(models.Sum('credit'), zero),
+            debit_total=Coalesce(models.Sum('debit'), zero),
+            voucher_total=Coalesce(models.Sum('voucher_amount'), zero),
+            refund_total=Coalesce(models.Sum('refund_amount'), zero),
+        )
+    )
+    # source NULL and '' share a bucket.
+    merged = {}
+    for row in rows.iterator():
+        key = (row['bank_id'], row['bank_account_no'], row['bank_deposit_date'], row['source'] or '', row['status'])
+        summary = merged.get(key)
+        if summary is None:
+            merged[key] = DailySummary(
+                bank_id=key[0], bank_account_no=key[1], date=key[2], source=key[3], status=key[4],
+                transaction_count=row['transaction_count'], credit=row['credit_total'],
+                debit=row['debit_total'], voucher_amount=row['voucher_total'],
+                refund_amount=row['refund_total'],
+            )
+        else:
+            summary.transaction_count += row['transaction_count']
+            summary.credit += row['credit_total']
+            summary.debit += row['debit_total']
+            summary.voucher_amount += row['voucher_total']
+            summary.refund_amount += row['refund_total']
+    DailySummary.objects.bulk_create(merged.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0004_transaction_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bank_account_no', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('source', models.CharField(blank=True, default='', max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('voucher_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='statement_tracker.bank')),
+            ],
+            options={
+                'verbose_name': 'Daily Summary',
+                'verbose_name_plural': 'Daily Summaries',
+                'indexes': [models.Index(fields=['date', 'bank'], name='summary_date_bank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('bank', 'bank_account_no', 'date', 'source', 'status'), name='unique_daily_summary')],
+            },
+        ),
+        migrations.RunPython(build_daily_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-17 18:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated_date(apps, schema_editor):
+    # Existing transactions have not changed since they were created, as far as we know.
+    Transaction = apps.get_model('statement_tracker', 'Transaction')
+    Transaction.objects.update(updated_date=models.F('created_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0005_daily_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bank',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+import django.db.models.deletion
+import statement_tracker.models
+from django.db import migrations, models
+
+# The SQL is frozen here rather than built by statement_tracker.search, so
+# later changes to that module cannot change what this migration did.
+
+COLUMNS = (
+    'system_voucher_no, bank_trans_id, cheque_no, policy_no, reverse_voucher_no, '
+    'reversal_correction_voucher_no, refund_voucher_no, transaction_detail, remarks'
+)
+NEW = ', '.join(f'new.{column}' for column in COLUMNS.split(', '))
+OLD = ', '.join(f'old.{column}' for column in COLUMNS.split(', '))
+DELETE = (
+    f"INSERT INTO statement_tracker_transaction_fts(statement_tracker_transaction_fts, rowid, {COLUMNS}) "
+    f"VALUES ('delete', old.id, {OLD});"
+)
+INSERT = f"INSERT INTO statement_tracker_transaction_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});"
+
+SQLITE_INSTALL = [
+    f"CREATE VIRTUAL TABLE statement_tracker_transaction_fts USING fts5({COLUMNS}, "
+    f"content='statement_tracker_transaction', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO statement_tracker_transaction_fts(statement_tracker_transaction_fts, rank) "
+    "VALUES ('rank', 'bm25(4.0, 4.0, 4.0, 4.0, 4.0, 4.0, 4.0, 1.0, 0.5)')",
+    f"CREATE TRIGGER statement_tracker_transaction_fts_insert AFTER INSERT ON statement_tracker_transaction "
+    f"BEGIN {INSERT} END",
+    f"CREATE TRIGGER statement_tracker_transaction_fts_delete AFTER DELETE ON statement_tracker_transaction "
+    f"BEGIN {DELETE} END",
+    f"CREATE TRIGGER statement_tracker_transaction_fts_update AFTER UPDATE OF {COLUMNS} "
+    f"ON statement_tracker_transaction BEGIN {DELETE} {INSERT} END",
+    "INSERT INTO statement_tracker_transaction_fts(statement_tracker_transaction_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_insert',
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_update',
+    'DROP TABLE IF EXISTS statement_tracker_transaction_fts',
+]
+
+# Adding a stored generated column rewrites the whole transaction table
+# under an ACCESS EXCLUSIVE lock: reads and writes of transactions wait
+# until it finishes. On a large ledger, run this migration in a
+# maintenance window.
+POSTGRESQL_INSTALL = [
+    "ALTER TABLE statement_tracker_transaction ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(system_voucher_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(bank_trans_id, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(cheque_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(policy_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(reverse_voucher_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(reversal_correction_voucher_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(refund_voucher_no, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(transaction_detail, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(remarks, '')), 'C')) STORED",
+    'CREATE INDEX txn_search_idx ON statement_tracker_transaction USING GIN (search_vector)',
+]
+POSTGRESQL_UNINSTALL = [
+    'ALTER TABLE statement_tracker_transaction DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+install_search_index = run({'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRESQL_INSTALL})
+uninstall_search_index = run({'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0007_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearchIndex',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='statement_tracker.transaction')),
+                ('document', statement_tracker.models.FullTextDocumentField(db_column='statement_tracker_transaction_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'statement_tracker_transaction_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+# Adding or removing the column rebuilds the table on SQLite, which drops
+# the full-text search triggers. Their SQL is frozen here, as in 0008.
+COLUMNS = (
+    'system_voucher_no, bank_trans_id, cheque_no, policy_no, reverse_voucher_no, '
+    'reversal_correction_voucher_no, refund_voucher_no, transaction_detail, remarks'
+)
+NEW = ', '.join(f'new.{column}' for column in COLUMNS.split(', '))
+OLD = ', '.join(f'old.{column}' for column in COLUMNS.split(', '))
+DELETE = (
+    f"INSERT INTO statement_tracker_transaction_fts(statement_tracker_transaction_fts, rowid, {COLUMNS}) "
+    f"VALUES ('delete', old.id, {OLD});"
+)
+INSERT = f"INSERT INTO statement_tracker_transaction_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});"
+TRIGGERS = [
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_insert',
+    f"CREATE TRIGGER statement_tracker_transaction_fts_insert AFTER INSERT ON statement_tracker_transaction "
+    f"BEGIN {INSERT} END",
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_delete',
+    f"CREATE TRIGGER statement_tracker_transaction_fts_delete AFTER DELETE ON statement_tracker_transaction "
+    f"BEGIN {DELETE} END",
+    'DROP TRIGGER IF EXISTS statement_tracker_transaction_fts_update',
+    f"CREATE TRIGGER statement_tracker_transaction_fts_update AFTER UPDATE OF {COLUMNS} "
+    f"ON statement_tracker_transaction BEGIN {DELETE} {INSERT} END",
+]
+
+
+def install_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0008_transaction_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, install_search_triggers),
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['fingerprint'], name='txn_fingerprint_idx'),
+        ),
+        migrations.RunPython(install_search_triggers, migrations.RunPython.noop),
+    ]
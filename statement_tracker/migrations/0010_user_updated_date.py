@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+def backfill_updated_date(apps, schema_editor):
+    User = apps.get_model('statement_tracker', 'User')
+    User.objects.update(updated_date=models.F('date_joined'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statement_tracker', '0009_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_date, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
 # models.py
+import hashlib
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
@@ -6,6 +9,9 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 import re
 from django.conf import settings
+from django.db import transaction as db_transaction
+from .validators import transaction_validator
+from . import images
 
 
 class CustomUserManager(BaseUserManager):
@@ -41,6 +47,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Transactions show usernames, so their ETags include this.
+    updated_date = models.DateTimeField(auto_now=True)
 
     objects = CustomUserManager()
 
@@ -103,6 +111,7 @@ class Bank(models.Model):
     name = models.CharField(max_length=255, unique=True, verbose_name='Bank Name')
     account_no = models.CharField(max_length=255)
     description = models.CharField(max_length=255, blank=True)
+    updated_date = models.DateTimeField(auto_now=True)
 
     def clean(self):
         super().clean()
@@ -154,14 +163,15 @@ class Transaction(models.Model):
 
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='transactions_created', on_delete=models.PROTECT)
     created_date = models.DateTimeField(default=timezone.now, editable=False)
+    updated_date = models.DateTimeField(auto_now=True)
 
     bank = models.ForeignKey('Bank', on_delete=models.PROTECT)
     bank_account_no = models.CharField(max_length=50)
-    bank_trans_id = models.CharField(max_length=100, null=True, blank=False)
+    bank_trans_id = models.CharField(max_length=100, null=True, blank=False, db_index=True)
     bank_deposit_date = models.DateField()
 
-    cheque_no = models.CharField(max_length=50, blank=True, null=True)
-    policy_no = models.CharField(max_length=100, blank=True, null=True)
+    cheque_no = models.CharField(max_length=50, blank=True, null=True, db_index=True)
+    policy_no = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     transaction_detail = models.TextField()
 
     system_voucher_no = models.CharField(max_length=100, unique=True)
@@ -191,6 +201,22 @@ class Transaction(models.Model):
     is_verified = models.BooleanField(default=False)
 
     voucher_image = models.ImageField(upload_to='voucher_images/', blank=True, null=True)
+    # Hash of the deposit's identifying fields, see compute_fingerprint().
+    fingerprint = models.CharField(max_length=32, blank=True, default='', editable=False)
+
+    # Columns compute_fingerprint() reads.
+    FINGERPRINT_FIELDS = (
+        'bank', 'bank_account_no', 'voucher_amount', 'bank_deposit_date', 'cheque_no', 'policy_no',
+    )
+
+    # Users whose usernames the API shows with the transaction.
+    USER_RELATIONS = ('created_by', 'reconciled_by', 'system_posted_by', 'system_verified_by')
+
+    # Columns that feed DailySummary.
+    SUMMARY_FIELDS = (
+        'bank_id', 'bank_account_no', 'bank_deposit_date', 'source', 'status',
+        'credit', 'debit', 'voucher_amount', 'refund_amount',
+    )
 
     class Meta:
         verbose_name = 'Transaction'
@@ -199,59 +225,86 @@ class Transaction(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['bank', 'bank_trans_id'], name='unique_bank_transaction')
         ]
+        indexes = [
+            # API list: keyset pagination, optionally scoped to the creator.
+            models.Index(fields=['-created_date', 'id'], name='txn_created_idx'),
+            models.Index(fields=['created_by', '-created_date', 'id'], name='txn_creator_created_idx'),
+            # Statement lookups and admin filters.
+            models.Index(fields=['bank', 'bank_deposit_date'], name='txn_bank_deposit_idx'),
+            models.Index(fields=['status', 'system_value_date'], name='txn_status_value_idx'),
+            # Work queues: only the rows still waiting on reconciliation/verification.
+            models.Index(
+                fields=['bank', 'bank_deposit_date'], name='txn_unreconciled_idx',
+                condition=~models.Q(status='Reconciled'),
+            ),
+            models.Index(
+                fields=['created_date'], name='txn_unverified_idx',
+                condition=models.Q(is_verified=False),
+            ),
+            # Duplicate-deposit check on every create and import.
+            models.Index(fields=['fingerprint'], name='txn_fingerprint_idx'),
+        ]
+
+    def stored_summary_row(self, using=None):
+        """
+        Lock the stored row and return what it contributes to DailySummary,
+        or None when it does not exist. Call inside a transaction: two
+        writers of one row then see each other's change, not the same
+        stale snapshot.
+        """
+        stored = (
+            type(self)._base_manager.using(using).select_for_update()
+            .filter(pk=self.pk).values(*self.SUMMARY_FIELDS).first()
+        )
+        return type(self)(**stored).summary_row() if stored else None
+
+    def summary_row(self):
+        """``(DailySummary key, amounts)`` this transaction contributes."""
+        # to_python: unsaved instances may still hold strings or float defaults.
+        value = lambda name: self._meta.get_field(name).to_python(getattr(self, name))
+        return (
+            (self.bank_id, self.bank_account_no, value('bank_deposit_date'), self.source or '', self.status),
+            (value('credit'), value('debit'), value('voucher_amount'), value('refund_amount') or 0),
+        )
+
+    def compute_fingerprint(self):
+        """
+        Hash of bank, account, amount, deposit date and cheque/policy number,
+        normalized so the same deposit typed in two ways collides:
+        identifiers lose case, punctuation and leading zeros.
+        """
+        to_python = lambda name: self._meta.get_field(name).to_python(getattr(self, name))
+        identifier = lambda value: ''.join(c for c in (value or '').upper() if c.isalnum()).lstrip('0')
+        parts = (
+            str(self.bank_id),
+            identifier(self.bank_account_no),
+            str(to_python('voucher_amount').quantize(Decimal('0.01'))),
+            to_python('bank_deposit_date').isoformat(),
+            identifier(self.cheque_no),
+            identifier(self.policy_no),
+        )
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+    @staticmethod
+    def may_be_same_deposit(bank_trans_id, other_bank_trans_id):
+        """
+        Whether two deposits with the same fingerprint may be one. Distinct
+        bank transaction ids mean the bank saw two deposits.
+        """
+        return not bank_trans_id or not other_bank_trans_id or bank_trans_id == other_bank_trans_id
 
     def clean(self):
         super().clean()
-        errors = {}
-
-        today = timezone.now().date()
-        if self.bank_deposit_date > today:
-            errors['bank_deposit_date'] = _('Deposit date cannot be in the future.')
-        if self.system_value_date > today:
-            errors['system_value_date'] = _('Value date cannot be in the future.')
-        if self.bank_deposit_date > self.system_value_date:
-            errors['system_value_date'] = _('Value date cannot be before deposit date.')
-
-        if self.debit < 0:
-            errors['debit'] = _('Debit amount cannot be negative.')
-        if self.credit < 0:
-            errors['credit'] = _('Credit amount cannot be negative.')
-        if self.debit > 0 and self.credit > 0:
-            errors['debit'] = errors['credit'] = _('Cannot have both debit and credit amounts.')
-        if self.voucher_amount <= 0:
-            errors['voucher_amount'] = _('Voucher amount must be positive.')
-
-        if self.refund_amount is not None:
-            if self.refund_amount < 0:
-                errors['refund_amount'] = _('Refund amount cannot be negative.')
-            if self.refund_amount > self.voucher_amount:
-                errors['refund_amount'] = _('Refund cannot exceed voucher amount.')
-
-        if not self.bank_account_no or not self.bank_account_no.strip():
-            errors['bank_account_no'] = _('Account number is required.')
-        elif not re.match(r'^[a-zA-Z0-9\-]+$', self.bank_account_no):
-            errors['bank_account_no'] = _('Account number contains invalid characters.')
-
-        if self.cheque_no and not re.match(r'^[a-zA-Z0-9\-]+$', self.cheque_no):
-            errors['cheque_no'] = _('Cheque number contains invalid characters.')
-
-        if not self.transaction_detail or len(self.transaction_detail.strip()) < 10:
-            errors['transaction_detail'] = _('Detail must be at least 10 characters.')
-
-        if not self.system_voucher_no or not self.system_voucher_no.strip():
-            errors['system_voucher_no'] = _('Voucher number is required.')
-        elif not re.match(r'^[a-zA-Z0-9\-_/]+$', self.system_voucher_no):
-            errors['system_voucher_no'] = _('Voucher number contains invalid characters.')
-
-        for field_name in ['reverse_voucher_no', 'reversal_correction_voucher_no', 'refund_voucher_no']:
-            val = getattr(self, field_name)
-            if val and not re.match(r'^[a-zA-Z0-9\-_/]+$', val):
-                errors[field_name] = _(f'{field_name.replace("_", " ").title()} contains invalid characters.')
-
-        if errors:
-            raise ValidationError(errors)
-
-    def save(self, *args, **kwargs):
+        transaction_validator.validate(self)
+        if self.voucher_image and not self.voucher_image._committed:
+            images.prepare_voucher_image(self.voucher_image)
+
+    def save(self, *args, validate=True, **kwargs):
+        """
+        Pass ``validate=False`` when the caller has already validated the
+        instance (the API serializer, the admin form), to skip a second
+        ``full_clean()`` and its unique-field queries.
+        """
         # Strip all text fields
         text_fields = [
             'bank_account_no', 'bank_trans_id', 'cheque_no', 'policy_no',
@@ -264,8 +317,127 @@ class Transaction(models.Model):
             if value and isinstance(value, str):
                 setattr(self, field, value.strip())
 
-        self.full_clean()
-        super().save(*args, **kwargs)
+        if validate:
+            self.full_clean()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'bank_id', *self.FINGERPRINT_FIELDS} & set(update_fields):
+            self.fingerprint = self.compute_fingerprint()
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'fingerprint']
+        # Keeps the row and its DailySummary update (post_save) together.
+        with db_transaction.atomic(using=kwargs.get('using')):
+            if self.voucher_image and not self.voucher_image._committed:
+                images.store_voucher_image_on_commit(self.voucher_image, kwargs.get('using'))
+            if self.pk is not None and (
+                update_fields is None or {'bank', *self.SUMMARY_FIELDS} & set(update_fields)
+            ):
+                self._summary_row = self.stored_summary_row(kwargs.get('using'))
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.system_voucher_no} - {self.transaction_detail[:50]}"
+
+
+class FullTextDocumentField(models.TextField):
+    """The hidden column of an FTS5 table that is named after the table."""
+
+
+@FullTextDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class TransactionSearchIndex(models.Model):
+    """
+    The SQLite FTS5 index of transactions, maintained by triggers (see
+    search.py). Only joined by ``search.search()``; it does not exist on
+    PostgreSQL, which indexes a ``search_vector`` column instead.
+    """
+    transaction = models.OneToOneField(
+        Transaction, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    document = FullTextDocumentField(db_column='statement_tracker_transaction_fts')
+    # bm25() with the column weights set by migration 0008; lower is better.
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'statement_tracker_transaction_fts'
+
+
+class DailySummary(models.Model):
+    """
+    Transaction totals per (bank, account, deposit date, source, status),
+    kept up to date on every write so reports never aggregate Transaction.
+    ``source`` is stored as '' rather than NULL so the unique key holds.
+    """
+    bank = models.ForeignKey('Bank', on_delete=models.CASCADE)
+    bank_account_no = models.CharField(max_length=50)
+    date = models.DateField()
+    source = models.CharField(max_length=50, blank=True, default='')
+    status = models.CharField(max_length=20)
+
+    transaction_count = models.IntegerField(default=0)
+    credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    voucher_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    refund_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Daily Summary'
+        verbose_name_plural = 'Daily Summaries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bank', 'bank_account_no', 'date', 'source', 'status'], name='unique_daily_summary'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['date', 'bank'], name='summary_date_bank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bank_id} {self.bank_account_no} {self.date} {self.source} {self.status}"
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting in the outbox. Views enqueue messages here and the
+    ``send_queued_mail`` worker delivers them, retrying with backoff.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(default=timezone.now, editable=False)
+    sent_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Outgoing Emails'
+        indexes = [
+            # The worker's queue: only messages still to be delivered.
+            models.Index(
+                fields=['next_attempt_at'], name='outbox_pending_idx',
+                condition=models.Q(status='Pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
@@ -0,0 +1,92 @@
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+# Delay before retry n is RETRY_BACKOFF * 2 ** (n - 1): 1, 2, 4, 8 and 16 minutes.
+RETRY_BACKOFF = timedelta(minutes=1)
+# A claimed message that is neither sent nor failed after this long (the
+# worker died mid-batch) is picked up again.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue(subject, message, from_email, recipient_list):
+    """Queue an email for the ``send_queued_mail`` worker; returns at once."""
+    return OutgoingEmail.objects.create(
+        subject=subject, body=message, from_email=from_email, to=list(recipient_list),
+    )
+
+
+def claim_batch(batch_size=BATCH_SIZE, now=None):
+    """
+    Take up to ``batch_size`` due messages off the queue by pushing their
+    next attempt past CLAIM_TIMEOUT. Concurrent workers skip each other's
+    locked rows, so no message is claimed twice.
+    """
+    now = now or timezone.now()
+    with db_transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_TIMEOUT,
+            )
+    for email in batch:
+        email.attempts += 1
+    return batch
+
+
+def deliver_batch(batch_size=BATCH_SIZE, connection=None, now=None):
+    """
+    Send one batch of due messages over a single backend connection.
+    Returns ``(sent, retried, failed)`` counts.
+    """
+    batch = claim_batch(batch_size, now)
+    if not batch:
+        return 0, 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    sent = retried = failed = 0
+    with connection:
+        for email in batch:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning('Sending email %s failed (attempt %s): %s', email.pk, email.attempts, e)
+                if _record_failure(email, e):
+                    retried += 1
+                else:
+                    failed += 1
+                # The connection may be broken; the next send opens a fresh one.
+                connection.close()
+            else:
+                OutgoingEmail.objects.filter(pk=email.pk).update(
+                    status='Sent', sent_date=timezone.now(), last_error='', body='',
+                )
+                sent += 1
+    return sent, retried, failed
+
+
+def _record_failure(email, error):
+    """Schedule a retry with exponential backoff; return False once the message is given up."""
+    if email.attempts >= MAX_ATTEMPTS:
+        OutgoingEmail.objects.filter(pk=email.pk).update(status='Failed', last_error=str(error), body='')
+        return False
+    delay = RETRY_BACKOFF * 2 ** (email.attempts - 1)
+    OutgoingEmail.objects.filter(pk=email.pk).update(
+        next_attempt_at=timezone.now() + delay, last_error=str(error),
+    )
+    return True
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+import drf_yasg
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+
+APP_DIR = Path(__file__).resolve().parent
+# Files the generated schema cannot depend on.
+IGNORED_SOURCES = ('tests.py',)
+IGNORED_DIRS = ('migrations', 'management', '__pycache__')
+SPEC_EXTENSIONS = {'openapi': 'json', 'json': 'json', 'yaml': 'yaml'}
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint():
+    """
+    Hash of the sources the schema is generated from: this app's modules,
+    the root URLconf and the drf-yasg version. Any serializer, view or route
+    change gives a new fingerprint, and so a new schema.
+    """
+    digest = hashlib.sha256(drf_yasg.__version__.encode())
+    paths = [path for path in APP_DIR.rglob('*.py') if not _is_ignored(path)]
+    paths.append(Path(import_module(settings.ROOT_URLCONF).__file__))
+    for path in sorted(paths):
+        digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _is_ignored(path):
+    parts = path.relative_to(APP_DIR).parts
+    return parts[-1] in IGNORED_SOURCES or any(part in IGNORED_DIRS for part in parts[:-1])
+
+
+def spec_extension(renderer_format):
+    # drf-yasg's compatibility renderers use '.json' and '.yaml' as formats.
+    return SPEC_EXTENSIONS.get(renderer_format.lstrip('.'))
+
+
+def schema_dir():
+    return Path(getattr(settings, 'OPENAPI_SCHEMA_DIR', settings.BASE_DIR / 'openapi'))
+
+
+def schema_path(extension):
+    return schema_dir() / f'openapi-{source_fingerprint()}.{extension}'
+
+
+class RenderedSchema:
+    def __init__(self, content, last_modified):
+        self.content = content
+        self.last_modified = last_modified
+        self.etag = f'"{hashlib.md5(content).hexdigest()}"'
+
+
+def get_cached_schema_view(info, **kwargs):
+    """
+    ``get_schema_view`` whose spec responses (JSON, YAML and the ``openapi``
+    format the UIs load) are generated once per source fingerprint and
+    served with ETag and Last-Modified. A file written for the current
+    fingerprint by ``generate_openapi_schema`` is served as is; otherwise the
+    schema is generated on the first request and kept for the process.
+    The UI pages themselves are cheap and left to drf-yasg.
+    """
+    base = get_schema_view(info, **kwargs)
+
+    class CachedSchemaView(base):
+        # (fingerprint, extension, version) -> RenderedSchema, for the process.
+        rendered = {}
+        lock = threading.Lock()
+
+        @classmethod
+        def render_spec(cls, renderer, version=''):
+            """Generate the schema without a request and encode it with ``renderer``."""
+            generator = cls.generator_class(info, version, kwargs.get('url'), kwargs.get('patterns'),
+                                            kwargs.get('urlconf'))
+            return renderer.render(generator.get_schema(None, public=True))
+
+        @classmethod
+        def get_rendered(cls, renderer, version=''):
+            extension = spec_extension(renderer.format)
+            key = (source_fingerprint(), extension, version)
+            with cls.lock:
+                if key not in cls.rendered:
+                    path = schema_path(extension)
+                    if not version and path.exists():
+                        last_modified = path.stat().st_mtime
+                        content = path.read_bytes()
+                    else:
+                        last_modified = timezone.now().timestamp()
+                        content = cls.render_spec(renderer, version)
+                    cls.rendered[key] = RenderedSchema(content, int(last_modified))
+                return cls.rendered[key]
+
+        def get(self, request, version='', format=None):
+            renderer = request.accepted_renderer
+            if not isinstance(renderer, _SpecRenderer):
+                return super().get(request, version, format)
+
+            schema = self.get_rendered(renderer, request.version or version or '')
+            response = get_conditional_response(
+                request, etag=schema.etag, last_modified=schema.last_modified
+            )
+            if response is None:
+                response = HttpResponse(
+                    schema.content, content_type=f'{renderer.media_type}; charset={renderer.charset}'
+                )
+            response['ETag'] = schema.etag
+            response['Last-Modified'] = http_date(schema.last_modified)
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+    return CachedSchemaView
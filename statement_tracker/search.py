@@ -0,0 +1,119 @@
+"""
+Full-text search over transactions.
+
+SQLite keeps an external-content FTS5 table, ``statement_tracker_transaction_fts``,
+in step with the transaction table through triggers. PostgreSQL keeps a stored
+generated ``search_vector`` tsvector column with a GIN index. Either way
+every write path, including bulk_create() and queryset.update(), keeps the
+index current without application code. Migration 0008 creates them from
+its own frozen copy of the SQL; on SQLite the FTS5 table is joined through
+the unmanaged TransactionSearchIndex model. SQLite drops the triggers
+whenever a migration rebuilds the transaction table, so such migrations
+must recreate them, as 0009 does.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = 'statement_tracker_transaction'
+FTS_TABLE = 'statement_tracker_transaction_fts'
+
+# (column, weight): identifiers outrank a word in the narration, which
+# outranks one in the remarks. Migration 0008 froze the matching bm25()
+# and setweight() weights.
+COLUMNS = (
+    ('system_voucher_no', 'A'),
+    ('bank_trans_id', 'A'),
+    ('cheque_no', 'A'),
+    ('policy_no', 'A'),
+    ('reverse_voucher_no', 'A'),
+    ('reversal_correction_voucher_no', 'A'),
+    ('refund_voucher_no', 'A'),
+    ('transaction_detail', 'B'),
+    ('remarks', 'C'),
+)
+MAX_TERMS = 8
+TRIGGERS = ('insert', 'delete', 'update')
+
+
+def install_triggers(connection):
+    """(Re)create the SQLite triggers that feed the FTS5 table, as 0008 did."""
+    if connection.vendor != 'sqlite':
+        return
+    names = [column for column, _ in COLUMNS]
+    columns = ', '.join(names)
+    new = ', '.join(f'new.{name}' for name in names)
+    old = ', '.join(f'old.{name}' for name in names)
+    delete = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new});"
+    for trigger, event, body in (
+        ('insert', 'INSERT', insert),
+        ('delete', 'DELETE', delete),
+        ('update', f'UPDATE OF {columns}', f'{delete} {insert}'),
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+            cursor.execute(f'CREATE TRIGGER {FTS_TABLE}_{trigger} AFTER {event} ON {TABLE} BEGIN {body} END')
+
+
+@contextmanager
+def bulk_load(connection):
+    """
+    For loading many transactions: on SQLite the FTS triggers are dropped
+    for the block, so inserts skip the per-row index update, then put back
+    and the index rebuilt once from the table. PostgreSQL's generated
+    column needs nothing.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+    try:
+        yield
+    finally:
+        install_triggers(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_terms(text):
+    """The words of ``text``, at most MAX_TERMS of them; punctuation is dropped."""
+    return re.findall(r'\w+', text)[:MAX_TERMS]
+
+
+def search(queryset, text):
+    """
+    Transactions matching every word of ``text`` as a prefix, annotated with
+    ``search_rank`` (higher is better).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Joined so that one MATCH drives the query and yields the rank.
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_index__document__match=match).annotate(
+            search_rank=-F('search_index__rank')
+        )
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        # search_vector exists only on the transaction table, so it needs no alias.
+        matches = RawSQL("search_vector @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        rank = RawSQL(
+            "ts_rank_cd(search_vector, to_tsquery('simple', %s))::float8", [tsquery], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+    # Other backends: an unranked scan.
+    condition = Q()
+    for term in terms:
+        condition &= Q.create([(f'{name}__icontains', term) for name, _ in COLUMNS], Q.OR)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -1,9 +1,17 @@
-from rest_framework import serializers
+from decimal import Decimal
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from .models import Bank, Transaction
-from django.core.mail import send_mail
+from .dashboard import DEFAULT_DAYS, MAX_DAYS
+from .banks import bank_cache
+from .authentication import UserClaimsRefreshToken
+from .images import RENDITIONS, prepare_upload, rendition_name, rendition_urls
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -20,6 +28,11 @@ from django.utils.encoding import force_bytes, force_str
 
 User = get_user_model()
 
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # The claims StatelessJWTAuthentication builds request.user from.
+    token_class = UserClaimsRefreshToken
+
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True, 
@@ -109,7 +122,8 @@ class BankSerializer(serializers.ModelSerializer):
         }
 
     def validate_name(self, value):
-        if Bank.objects.filter(name__iexact=value).exists():
+        existing = bank_cache.get_by_name(value)
+        if existing is not None and existing.pk != getattr(self.instance, 'pk', None):
             raise serializers.ValidationError("A bank with this name already exists.")
         return value
 
@@ -121,6 +135,26 @@ class BankSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(e.message_dict)
         return attrs
 
+class CachedBankField(serializers.PrimaryKeyRelatedField):
+    """Bank primary key field that resolves banks from the bank cache."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Bank.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        bank = bank_cache.get(pk)
+        if bank is None:
+            self.fail('does_not_exist', pk_value=data)
+        return bank
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     created_by_username = serializers.ReadOnlyField(source='created_by.username')
     reconciled_by_username = serializers.ReadOnlyField(
@@ -135,9 +169,17 @@ class TransactionSerializer(serializers.ModelSerializer):
         source='system_verified_by.username', 
         allow_null=True
     )
-    bank_name = serializers.ReadOnlyField(source='bank.name')
+    bank_name = serializers.SerializerMethodField()
+    # Resized WebP/JPEG copies of voucher_image; lists should show these.
+    voucher_image_renditions = serializers.SerializerMethodField()
+    allow_duplicate = serializers.BooleanField(
+        write_only=True, required=False, default=False,
+        help_text='Save even when the deposit looks like one already recorded.'
+    )
 
-    bank = serializers.PrimaryKeyRelatedField(queryset=Bank.objects.all())
+    bank = CachedBankField()
+    # Declared so it is required: the model column is nullable but blank=False.
+    bank_trans_id = serializers.CharField(max_length=100)
     created_by = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
         required=False,
@@ -162,10 +204,12 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
+        # Shared with TransactionListSerializer: one schema definition.
+        ref_name = 'Transaction'
         read_only_fields = (
             'id', 'created_date', 'created_by_username', 
             'reconciled_by_username', 'system_posted_by_username',
-            'system_verified_by_username', 'bank_name'
+            'system_verified_by_username', 'bank_name', 'voucher_image_renditions'
         )
         extra_kwargs = {
             'amount': {'required': True},
@@ -174,12 +218,34 @@ class TransactionSerializer(serializers.ModelSerializer):
             'is_verified': {'required': False},
         }
 
+    def get_bank_name(self, obj):
+        bank = bank_cache.get(obj.bank_id)
+        return bank.name if bank is not None else None
+
+    def get_voucher_image_renditions(self, obj):
+        urls = rendition_urls(obj.voucher_image)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {rendition: request.build_absolute_uri(url) for rendition, url in urls.items()}
+
+    def validate_voucher_image(self, value):
+        # Decoded and rendered here, before the view takes the row lock;
+        # Transaction.clean() and save() reuse the result.
+        if value:
+            try:
+                prepare_upload(value, Transaction._meta.get_field('voucher_image').storage)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.message_dict['voucher_image'])
+        return value
+
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Amount must be greater than zero.")
         return value
 
     def validate(self, attrs):
+        allow_duplicate = attrs.pop('allow_duplicate', False)
         try:
             instance = self.instance if self.instance else Transaction()
             for key, value in attrs.items():
@@ -191,6 +257,23 @@ class TransactionSerializer(serializers.ModelSerializer):
             else:
                 raise serializers.ValidationError(e.messages)
         
+        # Only when the identifying fields change, so existing pairs stay editable.
+        fingerprint = instance.compute_fingerprint()
+        if not allow_duplicate and fingerprint != instance.fingerprint:
+            candidates = Transaction.objects.filter(fingerprint=fingerprint).exclude(pk=instance.pk)
+            if instance.bank_trans_id:
+                # See Transaction.may_be_same_deposit().
+                candidates = candidates.filter(
+                    Q(bank_trans_id__isnull=True) | Q(bank_trans_id='') | Q(bank_trans_id=instance.bank_trans_id)
+                )
+            duplicate = candidates.values_list('pk', flat=True).first()
+            if duplicate is not None:
+                raise serializers.ValidationError(
+                    f'Likely duplicate of transaction {duplicate}: same bank, account, amount, '
+                    f'deposit date and cheque/policy number, and no different bank transaction id. '
+                    f'Send allow_duplicate=true to save it anyway.'
+                )
+
         # Additional business logic validation
         if attrs.get('transaction_type') == 'Withdrawal' and attrs.get('amount') > 10000:
             raise serializers.ValidationError(
@@ -205,21 +288,263 @@ class TransactionSerializer(serializers.ModelSerializer):
             validated_data['status'] = 'Pending'
         if 'is_verified' not in validated_data:
             validated_data['is_verified'] = False
-            
-        return super().create(validated_data)
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Format decimal fields for display
-        representation['amount'] = float(representation['amount'])
-        # Add human-readable transaction type
-        representation['transaction_type_display'] = instance.get_transaction_type_display()
-        return representation
-    
-    
+
+        # validate() has applied the model rules and the field and unique
+        # validators have run, so skip the second full_clean() in save().
+        instance = Transaction(**validated_data)
+        instance.save(validate=False)
+        return instance
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(validate=False)
+        return instance
+
+
+class TransactionRowListSerializer(serializers.ListSerializer):
+    """
+    Renders ``values()`` rows exactly as TransactionSerializer renders model
+    instances, byte for byte, without DRF's per-field machinery: the
+    lookup and formatter of every field are worked out once per response.
+    Read only.
+    """
+
+    def to_representation(self, data):
+        columns = self.child.row_columns()
+        rows = []
+        for row in data:
+            item = {}
+            for name, key, format in columns:
+                value = row[key]
+                item[name] = value if value is None or format is None else format(value)
+            rows.append(item)
+        return rows
+
+
+class TransactionListSerializer(TransactionSerializer):
+    """
+    TransactionSerializer for list responses. Pass ``many=True`` and rows
+    from ``queryset.values(*TransactionListSerializer.row_lookups())``.
+    """
+
+    class Meta(TransactionSerializer.Meta):
+        list_serializer_class = TransactionRowListSerializer
+
+    # SerializerMethodField name -> the row key its formatter reads.
+    ROW_METHOD_KEYS = {
+        'bank_name': 'bank',
+        'voucher_image_renditions': 'voucher_image',
+    }
+    _row_lookups = None
+
+    @classmethod
+    def row_lookups(cls):
+        """The ``values()`` lookups the rows need, ETag versions included."""
+        if cls._row_lookups is None:
+            lookups = {'id', 'bank', 'updated_date'}
+            lookups.update(f'{relation}__updated_date' for relation in Transaction.USER_RELATIONS)
+            lookups.update(key for _, key, _ in cls().row_columns())
+            cls._row_lookups = tuple(sorted(lookups))
+        return cls._row_lookups
+
+    def row_columns(self):
+        """``[(output name, row key, formatter or None), ...]`` in field order."""
+        request = self.context.get('request')
+        absolute_url = request.build_absolute_uri if request is not None else None
+        storage = Transaction._meta.get_field('voucher_image').storage
+
+        def url(name):
+            url = storage.url(name)
+            return absolute_url(url) if absolute_url is not None else url
+
+        bank_names = {}
+
+        def bank_name(pk):
+            # A page holds few banks; look each up once.
+            if pk not in bank_names:
+                bank = bank_cache.get(pk)
+                bank_names[pk] = bank.name if bank is not None else None
+            return bank_names[pk]
+
+        def renditions(name):
+            if not name:
+                return None
+            return {rendition: url(rendition_name(name, rendition)) for rendition in RENDITIONS}
+
+        methods = {'bank_name': bank_name, 'voucher_image_renditions': renditions}
+        columns = []
+        for field in self._readable_fields:
+            name = field.field_name
+            if isinstance(field, serializers.SerializerMethodField):
+                columns.append((name, self.ROW_METHOD_KEYS[name], methods[name]))
+                continue
+            key = field.source.replace('.', '__')
+            columns.append((name, key, self.row_formatter(field, url)))
+        return columns
+
+    def row_formatter(self, field, url):
+        """A function from the row value to the field's representation, None for as is."""
+        if isinstance(field, (
+            serializers.ReadOnlyField, serializers.RelatedField, serializers.BooleanField,
+            serializers.IntegerField, serializers.ChoiceField,
+        )):
+            # Related fields: values() already gives the primary key.
+            return None
+        if isinstance(field, serializers.CharField):
+            # DRF calls str(), a no-op on database strings.
+            return None
+        if (isinstance(field, serializers.DecimalField) and not field.localize and not field.normalize_output
+                and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)):
+            exponent = Decimal(1).scaleb(-field.decimal_places)
+            return lambda value: f'{value.quantize(exponent):f}'
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if str(output_format).lower() == ISO_8601 and field_timezone is not None:
+                def datetime_format(value):
+                    value = value.astimezone(field_timezone).isoformat()
+                    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+                return datetime_format
+        elif isinstance(field, serializers.DateField):
+            if str(getattr(field, 'format', api_settings.DATE_FORMAT)).lower() == ISO_8601:
+                return lambda value: value.isoformat()
+        elif isinstance(field, serializers.FileField):
+            if getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                return lambda name: url(name) if name else None
+            return lambda name: name or None
+        return field.to_representation
+
+
+class BankLookupField(serializers.CharField):
+    """
+    Resolves a bank id or name against ``context['banks']``, a bank
+    Catalogue, so resolving a row runs no queries.
+    Statements usually carry the bank name rather than our id.
+    """
+    default_error_messages = {'unknown': 'Unknown bank "{value}".'}
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        bank = self.context['banks'].resolve(value)
+        if bank is None:
+            self.fail('unknown', value=value)
+        return bank
+
+
+class TransactionImportSerializer(TransactionSerializer):
+    """
+    Validates one row of a bulk statement import.
+
+    The bank is resolved from ``context['banks']`` and uniqueness is checked
+    by the importer once per batch, so validating a row runs no queries.
+    """
+    bank = BankLookupField()
+
+    class Meta(TransactionSerializer.Meta):
+        fields = (
+            'bank', 'bank_account_no', 'bank_trans_id', 'bank_deposit_date',
+            'cheque_no', 'policy_no', 'transaction_detail', 'system_voucher_no',
+            'system_value_date', 'debit', 'credit', 'used_in_system',
+            'voucher_amount', 'refund_amount', 'reverse_voucher_no',
+            'reversal_correction_voucher_no', 'refund_voucher_no', 'remarks', 'source',
+        )
+        validators = []
+        extra_kwargs = {
+            'system_voucher_no': {'validators': []},
+        }
+
+    def validate(self, attrs):
+        # The importer runs the model rules over the whole batch at once.
+        return attrs
+
+
+class StatementLineSerializer(serializers.Serializer):
+    """One line of a bank statement submitted for matching."""
+    bank = BankLookupField()
+    bank_account_no = serializers.CharField(required=False, allow_blank=True, default='')
+    bank_trans_id = serializers.CharField(required=False, allow_blank=True, default='')
+    cheque_no = serializers.CharField(required=False, allow_blank=True, default='')
+    amount = serializers.DecimalField(max_digits=18, decimal_places=2)
+    date = serializers.DateField()
+
     
 
 
+class TransactionFilterSerializer(serializers.Serializer):
+    """
+    Parses the query-string filters of the transactions API. List fields take
+    repeated parameters, e.g. ``?status=Pending&status=Completed``.
+    """
+    bank = serializers.ListField(child=serializers.IntegerField(), required=False)
+    status = serializers.ListField(
+        child=serializers.ChoiceField(choices=Transaction.STATUS_CHOICES), required=False
+    )
+    source = serializers.ListField(
+        child=serializers.ChoiceField(choices=Transaction.SOURCE_TYPES), required=False
+    )
+    is_verified = serializers.BooleanField(required=False, allow_null=True)
+    used_in_system = serializers.BooleanField(required=False, allow_null=True)
+    deposit_date_from = serializers.DateField(required=False)
+    deposit_date_to = serializers.DateField(required=False)
+    value_date_from = serializers.DateField(required=False)
+    value_date_to = serializers.DateField(required=False)
+    amount_min = serializers.DecimalField(max_digits=18, decimal_places=2, required=False)
+    amount_max = serializers.DecimalField(max_digits=18, decimal_places=2, required=False)
+    system_voucher_no = serializers.CharField(required=False)
+    bank_trans_id = serializers.CharField(required=False)
+    cheque_no = serializers.CharField(required=False)
+    policy_no = serializers.CharField(required=False)
+
+
+class SummaryReportQuerySerializer(serializers.Serializer):
+    """Query parameters of the daily summary report."""
+    GROUP_BY_CHOICES = ('date', 'bank', 'bank_account_no', 'source', 'status')
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    bank = serializers.ListField(child=serializers.IntegerField(), required=False)
+    bank_account_no = serializers.CharField(required=False)
+    source = serializers.ListField(
+        child=serializers.ChoiceField(choices=Transaction.SOURCE_TYPES), required=False
+    )
+    status = serializers.ListField(
+        child=serializers.ChoiceField(choices=Transaction.STATUS_CHOICES), required=False
+    )
+    group_by = serializers.ListField(
+        child=serializers.ChoiceField(choices=GROUP_BY_CHOICES), required=False
+    )
+
+
+class DashboardMetricsQuerySerializer(serializers.Serializer):
+    """Query parameters of the dashboard metrics endpoint."""
+    days = serializers.IntegerField(min_value=1, max_value=MAX_DAYS, default=DEFAULT_DAYS)
+
+
+class TransactionBulkActionSerializer(serializers.Serializer):
+    """
+    Selects the transactions for a bulk action, either by ``ids`` or by a
+    ``filter`` object using the same keys as the list query parameters.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=10000
+    )
+    filter = serializers.DictField(required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Provide either "ids" or "filter".')
+        if 'filter' in attrs:
+            filter_serializer = TransactionFilterSerializer(data=attrs['filter'])
+            if not filter_serializer.is_valid():
+                raise serializers.ValidationError({'filter': filter_serializer.errors})
+            filters = {k: v for k, v in filter_serializer.validated_data.items() if v is not None}
+            if not filters:
+                raise serializers.ValidationError({'filter': ['Provide at least one known filter.']})
+            attrs['filter'] = filters
+        return attrs
+
+
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
 
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import dashboard, summaries
+from .authentication import invalidate_user_state
+from .banks import bank_cache
+from .models import Bank, Transaction
+
+# update_fields may name the bank FK either way.
+SUMMARY_UPDATE_FIELDS = set(Transaction.SUMMARY_FIELDS) | {'bank'}
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_summary_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SUMMARY_UPDATE_FIELDS & set(update_fields):
+        return
+    # Set by Transaction.save() from the locked row; None for new rows.
+    old_row = getattr(instance, '_summary_row', None)
+    new_row = instance.summary_row()
+    if old_row != new_row:
+        summaries.apply_changes([(old_row, -1), (new_row, 1)])
+    instance._summary_row = new_row
+
+
+@receiver(pre_delete, sender=Transaction)
+def lock_daily_summary_row_on_delete(sender, instance, using, **kwargs):
+    # From the locked row, as in Transaction.save(): the instance may be stale.
+    instance._summary_row = instance.stored_summary_row(using)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_daily_summary_on_delete(sender, instance, **kwargs):
+    summaries.apply_changes([(instance._summary_row, -1)])
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_dashboard_metrics(sender, **kwargs):
+    dashboard.invalidate()
+
+
+@receiver(post_save, sender=Bank)
+@receiver(post_delete, sender=Bank)
+def invalidate_bank_cache(sender, **kwargs):
+    bank_cache.invalidate()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user_state(sender, instance, **kwargs):
+    invalidate_user_state(instance.pk)
@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import DailySummary, Transaction
+
+KEY_FIELDS = ('bank_id', 'bank_account_no', 'date', 'source', 'status')
+AMOUNT_FIELDS = ('credit', 'debit', 'voucher_amount', 'refund_amount')
+
+
+def apply_changes(changes):
+    """
+    Fold ``(summary_row, sign)`` pairs into per-key deltas and apply each one
+    with a single ``UPDATE ... SET x = x + delta``, creating missing rows.
+    ``summary_row`` is ``Transaction.summary_row()`` or ``None`` (ignored).
+    """
+    deltas = {}
+    for row, sign in changes:
+        if row is None:
+            continue
+        key, amounts = row
+        delta = deltas.setdefault(key, [0, Decimal(0), Decimal(0), Decimal(0), Decimal(0)])
+        delta[0] += sign
+        for i, amount in enumerate(amounts, start=1):
+            delta[i] += sign * amount
+
+    for key, (count, *amounts) in deltas.items():
+        if not count and not any(amounts):
+            continue
+        lookup = dict(zip(KEY_FIELDS, key))
+        increments = {'transaction_count': F('transaction_count') + count}
+        increments.update({name: F(name) + amount for name, amount in zip(AMOUNT_FIELDS, amounts)})
+        if DailySummary.objects.filter(**lookup).update(**increments):
+            continue
+        try:
+            with db_transaction.atomic():
+                DailySummary.objects.create(
+                    transaction_count=count, **dict(zip(AMOUNT_FIELDS, amounts)), **lookup
+                )
+        except IntegrityError:
+            # Another writer created the row first.
+            DailySummary.objects.filter(**lookup).update(**increments)
+
+
+def record_created(transactions):
+    apply_changes((transaction.summary_row(), 1) for transaction in transactions)
+
+
+def record_status_change(queryset, status):
+    """
+    Move the rows of ``queryset`` to ``status`` in the summary. Call before
+    the UPDATE that changes their status, inside the same transaction.
+    """
+    fields = [field for field in Transaction.SUMMARY_FIELDS if field != 'status']
+    changes = []
+    for row in queryset.exclude(status=status).order_by().values(*fields, 'status').iterator():
+        old = Transaction(**row)
+        new = Transaction(**dict(row, status=status))
+        changes.extend([(old.summary_row(), -1), (new.summary_row(), 1)])
+    apply_changes(changes)
+
+
+def rebuild():
+    """Recreate the whole summary table from Transaction in one aggregate query."""
+    zero = Value(Decimal(0))
+    rows = (
+        Transaction.objects.order_by()
+        .values('bank_id', 'bank_account_no', 'bank_deposit_date', 'source', 'status')
+        .annotate(
+            transaction_count=Count('id'),
+            credit_total=Coalesce(Sum('credit'), zero),
+            debit_total=Coalesce(Sum('debit'), zero),
+            voucher_total=Coalesce(Sum('voucher_amount'), zero),
+            refund_total=Coalesce(Sum('refund_amount'), zero),
+        )
+    )
+    # source NULL and '' share a bucket, so merge before inserting.
+    merged = {}
+    for row in rows.iterator():
+        key = (row['bank_id'], row['bank_account_no'], row['bank_deposit_date'], row['source'] or '', row['status'])
+        totals = merged.setdefault(key, [0, Decimal(0), Decimal(0), Decimal(0), Decimal(0)])
+        totals[0] += row['transaction_count']
+        totals[1] += row['credit_total']
+        totals[2] += row['debit_total']
+        totals[3] += row['voucher_total']
+        totals[4] += row['refund_total']
+
+    with db_transaction.atomic():
+        DailySummary.objects.all().delete()
+        DailySummary.objects.bulk_create(
+            [
+                DailySummary(
+                    transaction_count=count,
+                    **dict(zip(KEY_FIELDS, key)),
+                    **dict(zip(AMOUNT_FIELDS, amounts)),
+                )
+                for key, (count, *amounts) in merged.items()
+            ],
+            batch_size=1000,
+        )
+    return len(merged)
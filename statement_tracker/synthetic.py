@@ -0,0 +1,152 @@
+"""
+Synthetic users, banks and transactions for load tests and benchmarks.
+
+Rows are drawn from a seeded random generator, so the same arguments on an
+empty database give the same ledger. Transactions are written with
+bulk_create(), which skips Transaction.save() and the signals; the
+generator fills in the fingerprint itself, checks every batch with the
+Transaction validator, and the caller rebuilds DailySummary afterwards.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Bank, Transaction, User
+from .validators import transaction_validator
+
+USERNAME_PREFIX = 'bench_'
+BANK_NAMES = (
+    'Nabil Bank', 'Nepal Investment Mega Bank', 'Global IME Bank', 'Himalayan Bank', 'NIC Asia Bank',
+    'Everest Bank', 'Standard Chartered Bank Nepal', 'Kumari Bank', 'Laxmi Sunrise Bank', 'Prabhu Bank',
+    'Siddhartha Bank', 'Machhapuchchhre Bank', 'Citizens Bank International', 'Prime Commercial Bank',
+    'Sanima Bank', 'NMB Bank', 'Agricultural Development Bank', 'Nepal Bank', 'Rastriya Banijya Bank',
+    'Nepal SBI Bank',
+)
+FIRST_NAMES = ('Ram', 'Sita', 'Hari', 'Gita', 'Krishna', 'Maya', 'Bikash', 'Sunita', 'Rajesh', 'Anita')
+LAST_NAMES = ('Thapa', 'Sharma', 'Shrestha', 'Gurung', 'Adhikari', 'Karki', 'Rai', 'Tamang', 'Poudel', 'KC')
+PURPOSES = ('Premium deposit', 'Renewal premium', 'Policy loan repayment', 'Late fee payment', 'Proposal deposit')
+BRANCHES = ('Kathmandu', 'Pokhara', 'Biratnagar', 'Butwal', 'Dharan', 'Chitwan', 'Nepalgunj', 'Birgunj')
+
+# Weights: most of a real ledger is old and reconciled.
+STATUS_WEIGHTS = {'Reconciled': 60, 'Completed': 20, 'Pending': 15, 'Cancelled': 5}
+
+
+def ensure_users(count, password, staff=1):
+    """
+    ``count`` users named ``bench_0``, ``bench_1``..., the first ``staff`` of
+    them staff, all with ``password``. Existing ones are reused. The password
+    is hashed once for all of them.
+    """
+    existing = {user.username: user for user in User.objects.filter(username__startswith=USERNAME_PREFIX)}
+    hashed = make_password(password)
+    new = []
+    for i in range(count):
+        username = f'{USERNAME_PREFIX}{i}'
+        if username not in existing:
+            new.append(User(
+                email=f'{username}@example.com', username=username,
+                full_name=f'{FIRST_NAMES[i % 10]} {LAST_NAMES[i // 10 % 10]}',
+                password=hashed, is_staff=i < staff,
+            ))
+    User.objects.bulk_create(new)
+    return list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk')[:count])
+
+
+def ensure_banks(count):
+    """The first ``count`` banks, creating synthetic ones as needed."""
+    banks = list(Bank.objects.order_by('pk')[:count])
+    names = set(Bank.objects.values_list('name', flat=True))
+    i = 0
+    while len(banks) < count:
+        name = BANK_NAMES[i % len(BANK_NAMES)]
+        if i >= len(BANK_NAMES):
+            name = f'{name} {i // len(BANK_NAMES) + 1}'
+        if name not in names:
+            banks.append(Bank.objects.create(name=name, account_no=f'{i + 1:04d}'))
+        i += 1
+    return banks
+
+
+def generate_transactions(count, users, banks, rng=None, batch_size=5000, progress=None):
+    """
+    Insert ``count`` transactions spread over the last two years, covering
+    every source and status. Returns the number inserted. ``progress`` is
+    called with the running total after each batch.
+    """
+    rng = rng or random.Random()
+    sources = [value for value, _ in Transaction.SOURCE_TYPES]
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    staff = [user for user in users if user.is_staff] or users
+    # Each bank holds a few collection accounts.
+    accounts = {bank.pk: [f'ACC-{rng.randint(1000000, 9999999)}' for _ in range(3)] for bank in banks}
+    now = timezone.now()
+    today = now.date()
+    # Numbers continue from the highest id so repeated runs never collide.
+    offset = (Transaction.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    created = 0
+    while created < count:
+        objects = []
+        for index in range(created, min(created + batch_size, count)):
+            number = offset + index
+            age = rng.randint(0, 730)
+            deposit_date = today - timedelta(days=age)
+            # Recent deposits are still being worked on.
+            status = rng.choices(statuses, weights)[0] if age > 14 else rng.choice(('Pending', 'Completed'))
+            source = sources[index % len(sources)]
+            amount = Decimal(rng.randint(50000, 50000000)) / 100
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            bank = rng.choice(banks)
+            obj = Transaction(
+                created_by=rng.choice(users),
+                created_date=now - timedelta(days=age, seconds=rng.randint(0, 86399)),
+                bank=bank,
+                bank_account_no=rng.choice(accounts[bank.pk]),
+                bank_trans_id=f'BT{number}',
+                bank_deposit_date=deposit_date,
+                cheque_no=f'{rng.randint(100000, 999999)}{number}' if source == 'Cheque' else None,
+                policy_no=f'POL-{rng.randint(1, 500000):07d}' if rng.random() < 0.8 else None,
+                transaction_detail=f'{rng.choice(PURPOSES)} by {name}, {rng.choice(BRANCHES)} branch',
+                system_voucher_no=f'SV{number}',
+                system_value_date=min(deposit_date + timedelta(days=rng.randint(0, 3)), today),
+                credit=amount,
+                voucher_amount=amount,
+                refund_amount=Decimal(0),
+                used_in_system=status in ('Completed', 'Reconciled'),
+                source=source,
+                status=status,
+                is_verified=status == 'Reconciled' or (status == 'Completed' and rng.random() < 0.5),
+            )
+            if obj.is_verified:
+                obj.system_verified_by = rng.choice(staff)
+            if obj.used_in_system:
+                obj.system_posted_by = rng.choice(staff)
+            if status == 'Reconciled':
+                obj.reconciled_by = rng.choice(staff)
+                obj.reconciled_date = min(obj.system_value_date + timedelta(days=rng.randint(0, 10)), today)
+            elif status == 'Cancelled':
+                obj.reverse_voucher_no = f'RV{number}'
+                if rng.random() < 0.3:
+                    obj.reversal_correction_voucher_no = f'RC{number}'
+                obj.remarks = 'Reversed: deposit entered against the wrong policy'
+            if rng.random() < 0.03:
+                obj.refund_amount = (amount * Decimal(rng.randint(1, 100)) / 100).quantize(Decimal('0.01'))
+                obj.refund_voucher_no = f'RF{number}'
+                obj.remarks = 'Excess premium refunded'
+            obj.fingerprint = obj.compute_fingerprint()
+            objects.append(obj)
+
+        failures = transaction_validator.validate_many(objects)
+        if failures:
+            index, errors = failures[0]
+            raise ValueError(f'Generated an invalid transaction {objects[index].system_voucher_no}: {errors}')
+        Transaction.objects.bulk_create(objects)
+        created += len(objects)
+        if progress is not None:
+            progress(created)
+    return created
@@ -1,3 +1,1291 @@
-from django.test import TestCase
+import csv
+import datetime
+import smtplib
+import io
+import json
+import posixpath
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction as db_transaction
+from django.test import TestCase, override_settings
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import banks, exports, images, loadtest, outbox, summaries
+from .authentication import UserClaimsRefreshToken
+from .banks import bank_cache
+from .instrumentation import QueryRecorder, registry as metrics_registry
+from .models import Bank, DailySummary, OutgoingEmail, Transaction, User
+from .serializers import TransactionListSerializer, TransactionSerializer
+from .validators import transaction_validator
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TransactionAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            'staff@example.com', 'staff_user', 'Staff User', 'pass12345', is_staff=True
+        )
+        cls.teller = User.objects.create_user(
+            'teller@example.com', 'teller_user', 'Teller User', 'pass12345'
+        )
+        cls.bank = Bank.objects.create(name='Nabil Bank', account_no='0001')
+
+    def setUp(self):
+        # Cached catalogues and metrics must not leak between tests.
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def make_transactions(self, count, created_by=None, created_date=None, **extra):
+        start = Transaction.objects.count()
+        transactions = []
+        for i in range(start, start + count):
+            fields = dict(
+                created_by=created_by or self.teller,
+                bank=self.bank,
+                bank_account_no='ACC-001',
+                bank_trans_id=f'TRN-{i}',
+                bank_deposit_date=datetime.date(2025, 1, 1),
+                transaction_detail='Premium deposit by customer',
+                system_voucher_no=f'V-{i}',
+                system_value_date=datetime.date(2025, 1, 2),
+                voucher_amount='100.00',
+            )
+            fields.update(extra)
+            if created_date is not None:
+                fields['created_date'] = created_date
+            transactions.append(Transaction.objects.create(**fields))
+        return transactions
+
+    def payload(self, **extra):
+        """A transaction for the API, not a duplicate of any make_transactions() row."""
+        payload = {
+            'bank': self.bank.pk, 'bank_account_no': 'ACC-001', 'bank_trans_id': 'TRN-NEW',
+            'bank_deposit_date': '2025-01-01', 'transaction_detail': 'Premium deposit by customer',
+            'system_voucher_no': 'V-NEW', 'system_value_date': '2025-01-02', 'voucher_amount': '100.00',
+        }
+        payload.update(extra)
+        return payload
+
+    csv_header = (
+        'bank,bank_account_no,bank_trans_id,bank_deposit_date,transaction_detail,'
+        'system_voucher_no,system_value_date,voucher_amount\n'
+    )
+
+    def csv_row(self, voucher, trans_id, bank='Nabil Bank', amount='250.00'):
+        return f'{bank},ACC-001,{trans_id},2025-01-01,Premium deposit by customer,{voucher},2025-01-02,{amount}\n'
+
+
+class TransactionPaginationTests(TransactionAPITestCase):
+    def test_cursor_walks_ties_without_duplicates(self):
+        same_instant = timezone.now()
+        self.make_transactions(7, created_date=same_instant)
+        self.make_transactions(3)
+
+        seen = []
+        url = '/api/transactions/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(
+            Transaction.objects.order_by('-created_date', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        self.make_transactions(5)
+        first = self.client.get('/api/transactions/?page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']],
+        )
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/transactions/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class TransactionQueryCountTests(TransactionAPITestCase):
+    def count_list_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/transactions/?page_size={page_size}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        # Give every row a distinct user on each relation the serializer reads.
+        for i, transaction in enumerate(self.make_transactions(20)):
+            user = User.objects.create_user(
+                f'user{i}@example.com', f'user_{i}', 'Desk User', 'pass12345'
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(
+                reconciled_by=user, system_posted_by=user, system_verified_by=user
+            )
+
+        bank_cache.catalogue()  # loaded once per process, not per request
+        self.assertEqual(self.count_list_queries(2), self.count_list_queries(20))
+
+
+class TransactionBulkImportTests(TransactionAPITestCase):
+    def upload(self, body, name='statement.csv'):
+        upload = SimpleUploadedFile(name, body.encode(), content_type='text/csv')
+        return self.client.post('/api/transactions/bulk-import/', {'file': upload}, format='multipart')
+
+    def test_imports_all_rows(self):
+        body = self.csv_header + ''.join(self.csv_row(f'IMP-{i}', f'T-{i}', amount=f'{250 + i}.00') for i in range(30))
+        response = self.upload(body)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 30)
+        self.assertEqual(Transaction.objects.filter(created_by=self.staff).count(), 30)
+
+    def test_rejects_whole_file_with_row_errors(self):
+        self.make_transactions(1)  # V-0 / TRN-0
+        body = self.csv_header + ''.join([
+            self.csv_row('IMP-1', 'T-1'),
+            self.csv_row('V-0', 'T-2'),
+            self.csv_row('IMP-3', 'TRN-0'),
+            self.csv_row('IMP-1', 'T-4'),
+            self.csv_row('IMP-5', 'T-5', bank='Unknown Bank'),
+        ])
+        response = self.upload(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in response.data['errors']],
+            [(2, ['system_voucher_no']), (3, ['bank_trans_id']), (4, ['system_voucher_no']), (5, ['bank'])],
+        )
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_accepts_json_lines(self):
+        rows = [self.payload(bank_trans_id='J-1', system_voucher_no='JV-1', voucher_amount='10.00')]
+        response = self.upload('\n'.join(json.dumps(row) for row in rows), name='statement.jsonl')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+
+
+class TransactionExportTests(TransactionAPITestCase):
+    def test_csv_export_is_scoped_to_the_user(self):
+        self.make_transactions(3)
+        self.make_transactions(2, created_by=self.staff)
+
+        self.client.force_authenticate(self.teller)
+        response = self.client.get('/api/transactions/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['ID', 'Created Date', 'Created By'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row[2] for row in rows[1:]}, {'teller_user'})
+
+    def test_xlsx_export(self):
+        transaction = self.make_transactions(1)[0]
+        response = self.client.get('/api/transactions/export/', {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.xlsx', response['Content-Disposition'])
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)['Transactions']
+        header, row = [list(values) for values in sheet.iter_rows(values_only=True)]
+        self.assertEqual(header, [header for header, _ in exports.EXPORT_COLUMNS])
+        row = dict(zip(header, row))
+        self.assertEqual(
+            (row['ID'], row['Created By'], row['Bank'], row['System Voucher No'], row['Voucher Amount']),
+            (transaction.pk, 'teller_user', 'Nabil Bank', transaction.system_voucher_no, 100),
+        )
+        self.assertEqual(row['Bank Deposit Date'], datetime.datetime(2025, 1, 1))
+        # Written naive, in the current time zone; Excel keeps milliseconds.
+        self.assertAlmostEqual(
+            row['Created Date'], timezone.make_naive(transaction.created_date), delta=datetime.timedelta(seconds=1)
+        )
+
+
+class TransactionFilterTests(TransactionAPITestCase):
+    def ids(self, query):
+        response = self.client.get(f'/api/transactions/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row['id'] for row in response.data['results'])
+
+    def test_filters(self):
+        first, second, third = self.make_transactions(3)
+        Transaction.objects.filter(pk=first.pk).update(status='Reconciled', voucher_amount=500, cheque_no='CHQ-9')
+        Transaction.objects.filter(pk=second.pk).update(is_verified=True, bank_deposit_date=datetime.date(2024, 6, 1))
+
+        self.assertEqual(self.ids('status=Reconciled'), [first.pk])
+        self.assertEqual(self.ids('status=Reconciled&status=Pending'), [first.pk, second.pk, third.pk])
+        self.assertEqual(self.ids('is_verified=false'), [first.pk, third.pk])
+        self.assertEqual(self.ids('deposit_date_to=2024-12-31'), [second.pk])
+        self.assertEqual(self.ids('amount_min=200'), [first.pk])
+        self.assertEqual(self.ids('cheque_no=CHQ-9'), [first.pk])
+        self.assertEqual(self.ids(f'system_voucher_no={third.system_voucher_no}'), [third.pk])
+
+    def test_invalid_filter_is_400(self):
+        response = self.client.get('/api/transactions/?status=Lost&deposit_date_from=yesterday')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data), ['deposit_date_from', 'status'])
+
+    def test_ordering_paginates(self):
+        transactions = self.make_transactions(5)
+        for i, transaction in enumerate(transactions):
+            Transaction.objects.filter(pk=transaction.pk).update(voucher_amount=10 * (i % 2) + 1)
+
+        seen = []
+        url = '/api/transactions/?ordering=-voucher_amount&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = list(
+            Transaction.objects.order_by('-voucher_amount', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+
+class TransactionBulkActionTests(TransactionAPITestCase):
+    def test_bulk_reconcile_by_ids(self):
+        first, second, third = self.make_transactions(3)
+        Transaction.objects.filter(pk=second.pk).update(status='Reconciled')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                '/api/transactions/bulk-reconcile/',
+                {'ids': [first.pk, second.pk, third.pk, 999999]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'changed': [first.pk, third.pk], 'already': [second.pk], 'missing': [999999],
+        })
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "statement_tracker_transaction"')]
+        self.assertEqual(len(updates), 1)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'Reconciled')
+        self.assertEqual(first.reconciled_by, self.staff)
+        self.assertIsNotNone(first.reconciled_date)
+
+    def test_bulk_verify_by_filter(self):
+        first, second = self.make_transactions(2)
+        Transaction.objects.filter(pk=first.pk).update(source='Esewa')
+
+        response = self.client.post(
+            '/api/transactions/bulk-verify/', {'filter': {'source': ['Esewa']}}, format='json'
+        )
+        self.assertEqual(response.data, {'changed': [first.pk], 'already': [], 'missing': []})
+        self.assertEqual(list(Transaction.objects.filter(is_verified=True)), [first])
+
+    def test_bulk_action_needs_a_selection(self):
+        for body in ({}, {'filter': {'unknown': 1}}, {'ids': [1], 'filter': {'status': ['Pending']}}):
+            response = self.client.post('/api/transactions/bulk-verify/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_bulk_action_is_staff_only(self):
+        self.client.force_authenticate(self.teller)
+        response = self.client.post('/api/transactions/bulk-verify/', {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class StatementMatchingTests(TransactionAPITestCase):
+    def test_match_statement(self):
+        by_id, by_cheque, by_amount, twin_a, twin_b, reconciled = self.make_transactions(6)
+        Transaction.objects.filter(pk=by_cheque.pk).update(cheque_no='CHQ-1', voucher_amount=300)
+        Transaction.objects.filter(pk=by_amount.pk).update(voucher_amount=450, bank_deposit_date=datetime.date(2025, 1, 3))
+        Transaction.objects.filter(pk__in=[twin_a.pk, twin_b.pk]).update(voucher_amount=700)
+        Transaction.objects.filter(pk=reconciled.pk).update(status='Reconciled', voucher_amount=900)
+
+        body = 'bank,bank_trans_id,cheque_no,amount,date\n' + ''.join([
+            f'Nabil Bank,{by_id.bank_trans_id},,100.00,2025-01-01\n',
+            'Nabil Bank,,CHQ-1,300.00,2025-01-01\n',
+            'Nabil Bank,,,450.00,2025-01-01\n',
+            'Nabil Bank,,,700.00,2025-01-02\n',
+            'Nabil Bank,,,900.00,2025-01-01\n',
+        ])
+        upload = SimpleUploadedFile('statement.csv', body.encode(), content_type='text/csv')
+        response = self.client.post(
+            '/api/transactions/match-statement/', {'file': upload, 'apply': 'true'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['matched'], [
+            {'row': 1, 'transaction': by_id.pk, 'rule': 'bank_trans_id'},
+            {'row': 2, 'transaction': by_cheque.pk, 'rule': 'cheque_no'},
+            {'row': 3, 'transaction': by_amount.pk, 'rule': 'amount_date'},
+        ])
+        self.assertEqual(response.data['ambiguous'], [{'row': 4, 'candidates': [twin_a.pk, twin_b.pk]}])
+        self.assertEqual(response.data['unmatched'], [5])
+        self.assertEqual(
+            set(Transaction.objects.filter(status='Reconciled').values_list('pk', flat=True)),
+            {by_id.pk, by_cheque.pk, by_amount.pk, reconciled.pk},
+        )
+
+
+class TransactionValidationTests(TransactionAPITestCase):
+    def test_create_validates_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/transactions/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        voucher_checks = [q for q in ctx.captured_queries if '"system_voucher_no" =' in q['sql']]
+        self.assertEqual(len(voucher_checks), 1)
+
+    def test_create_reports_model_rules(self):
+        response = self.client.post(
+            '/api/transactions/',
+            self.payload(cheque_no='bad cheque!', system_value_date='2024-12-31'),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data), ['cheque_no', 'system_value_date'])
+
+    def test_create_requires_bank_trans_id(self):
+        payload = self.payload()
+        del payload['bank_trans_id']
+        response = self.client.post('/api/transactions/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bank_trans_id', response.data)
+
+    def test_validate_many(self):
+        good, bad = self.make_transactions(2)
+        bad.voucher_amount = 0
+        bad.refund_voucher_no = 'RV 1'
+        failures = transaction_validator.validate_many([good, bad])
+        self.assertEqual([index for index, _ in failures], [1])
+        self.assertEqual(sorted(failures[0][1]), ['refund_voucher_no', 'voucher_amount'])
+
+
+class DailySummaryTests(TransactionAPITestCase):
+    def summary_table(self):
+        return sorted(
+            DailySummary.objects.filter(transaction_count__gt=0).values_list(
+                'bank_id', 'bank_account_no', 'date', 'source', 'status', 'transaction_count',
+                'credit', 'debit', 'voucher_amount', 'refund_amount',
+            )
+        )
+
+    def assert_matches_rebuild(self):
+        maintained = self.summary_table()
+        summaries.rebuild()
+        self.assertEqual(maintained, self.summary_table())
+
+    def test_summary_follows_every_write_path(self):
+        first, second, third = self.make_transactions(3, source='Esewa')
+        self.assert_matches_rebuild()
+
+        first.voucher_amount = 250
+        first.source = None
+        first.save()
+        self.client.patch(f'/api/transactions/{second.pk}/', {'credit': '40.00'}, format='json')
+        self.client.post(f'/api/transactions/{third.pk}/verify/')
+        self.client.post(f'/api/transactions/{third.pk}/reconcile/')
+        self.client.post('/api/transactions/bulk-reconcile/', {'ids': [first.pk, second.pk]}, format='json')
+        self.assert_matches_rebuild()
+
+        upload = SimpleUploadedFile(
+            'statement.csv', (self.csv_header + self.csv_row('IMP-V1', 'IMP-1', amount='75.00')).encode()
+        )
+        self.client.post('/api/transactions/bulk-import/', {'file': upload}, format='multipart')
+        Transaction.objects.filter(pk=second.pk).delete()
+        self.assert_matches_rebuild()
+
+    def test_concurrent_saves_of_one_row_count_once(self):
+        transaction = self.make_transactions(1)[0]
+        # Two requests that read the row before either wrote it.
+        first, second = Transaction.objects.get(pk=transaction.pk), Transaction.objects.get(pk=transaction.pk)
+        for copy in (first, second):
+            copy.status = 'Reconciled'
+            copy.save(update_fields=['status', 'updated_date'], validate=False)
+        self.assertEqual(
+            dict(DailySummary.objects.values_list('status', 'transaction_count')),
+            {'Pending': 0, 'Reconciled': 1},
+        )
+        self.assert_matches_rebuild()
+
+        response = self.client.post(f'/api/transactions/{transaction.pk}/reconcile/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleting_stale_instance_uses_stored_row(self):
+        transaction = self.make_transactions(1)[0]
+        stale = Transaction.objects.get(pk=transaction.pk)
+        transaction.status = 'Reconciled'
+        transaction.save(update_fields=['status', 'updated_date'], validate=False)
+        stale.delete()
+        self.assertEqual(self.summary_table(), [])
+        self.assert_matches_rebuild()
+
+    def test_summary_report(self):
+        self.make_transactions(2)
+        self.make_transactions(1, bank_deposit_date=datetime.date(2025, 1, 2), status='Completed')
+
+        response = self.client.get('/api/reports/summary/?group_by=date&group_by=status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'date': datetime.date(2025, 1, 1), 'status': 'Pending', 'transaction_count': 2,
+             'credit': '0.00', 'debit': '0.00', 'voucher_amount': '200.00', 'refund_amount': '0.00'},
+            {'date': datetime.date(2025, 1, 2), 'status': 'Completed', 'transaction_count': 1,
+             'credit': '0.00', 'debit': '0.00', 'voucher_amount': '100.00', 'refund_amount': '0.00'},
+        ])
+
+        response = self.client.get('/api/reports/summary/?date_from=2025-01-02')
+        self.assertEqual([row['transaction_count'] for row in response.data['results']], [1])
+
+
+class DashboardMetricsTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+
+    def make_today(self, count, **extra):
+        return self.make_transactions(
+            count, bank_deposit_date=self.today, system_value_date=self.today, **extra
+        )
+
+    def test_metrics_series(self):
+        self.make_today(2, source='Esewa')
+        self.make_today(1, refund_amount='30.00', is_verified=True, status='Reconciled')
+
+        response = self.client.get('/api/dashboard/metrics/?days=7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['daily']), 7)
+        self.assertEqual(response.data['daily'][-1], {
+            'date': self.today.isoformat(), 'count': 3, 'deposits': '300.00', 'refunds': '30.00',
+        })
+        self.assertEqual(response.data['daily'][0]['count'], 0)
+        self.assertEqual(response.data['by_source'], [
+            {'source': None, 'count': 1}, {'source': 'Esewa', 'count': 2},
+        ])
+        self.assertEqual(response.data['by_status'], [
+            {'status': 'Pending', 'count': 2}, {'status': 'Reconciled', 'count': 1},
+        ])
+        self.assertEqual(response.data['backlog']['unverified'], 2)
+        self.assertEqual(response.data['backlog']['unverified_amount'], '200.00')
+        self.assertEqual(response.data['backlog']['unreconciled'], 2)
+
+    def test_metrics_are_cached_until_a_write(self):
+        first = self.make_today(1)[0]
+        self.client.get('/api/dashboard/metrics/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/dashboard/metrics/')
+        self.assertEqual(response.data['daily'][-1]['count'], 1)
+        self.assertFalse(any('statement_tracker' in query['sql'] for query in ctx.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.make_today(1)[0]
+        response = self.client.get('/api/dashboard/metrics/')
+        self.assertEqual(response.data['daily'][-1]['count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/bulk-verify/', {'ids': [first.pk, second.pk]}, format='json')
+        response = self.client.get('/api/dashboard/metrics/')
+        self.assertEqual(response.data['backlog']['unverified'], 0)
+
+    def test_metrics_require_staff(self):
+        self.client.force_authenticate(self.teller)
+        self.assertEqual(self.client.get('/api/dashboard/metrics/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/dashboard/metrics/?days=0').status_code, 400)
+
+
+class InstrumentationTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics_registry.reset()
+
+    def test_server_timing_and_metrics(self):
+        self.make_transactions(2)
+        response = self.client.get('/api/transactions/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries, 0 duplicate"$')
+
+        metrics = self.client.get('/api/_metrics/')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertTrue(metrics['Content-Type'].startswith('text/plain'))
+        body = metrics.content.decode()
+        self.assertIn('http_requests_total{view="TransactionViewSet.list",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="TransactionViewSet.list",method="GET"} 1', body)
+        self.assertIn('http_request_queries_bucket{view="TransactionViewSet.list",method="GET",le="+Inf"} 1', body)
+
+    def test_server_timing_is_for_staff(self):
+        self.client.force_authenticate(self.teller)
+        self.assertNotIn('Server-Timing', self.client.get('/api/transactions/'))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get('/api/transactions/'))
+
+    def test_actions_are_labelled(self):
+        transaction = self.make_transactions(1)[0]
+        for _ in range(2):
+            self.client.post(f'/api/transactions/{transaction.pk}/verify/')
+        body = self.client.get('/api/_metrics/').content.decode()
+        self.assertIn('http_requests_total{view="TransactionViewSet.verify",method="POST",status="200"} 1', body)
+        self.assertIn('http_requests_total{view="TransactionViewSet.verify",method="POST",status="400"} 1', body)
+
+    def test_streamed_responses_are_recorded_when_closed(self):
+        self.make_transactions(3)
+        response = self.client.get('/api/transactions/export/')
+        self.assertNotIn('TransactionViewSet.export', self.client.get('/api/_metrics/').content.decode())
+        body = b''.join(response.streaming_content)
+
+        metrics = self.client.get('/api/_metrics/').content.decode()
+        labels = 'view="TransactionViewSet.export",method="GET"'
+        self.assertIn(f'http_response_bytes_total{{{labels}}} {len(body)}', metrics)
+        # The export query runs while the body streams.
+        queries = float(re.search(rf'http_request_queries_sum{{{labels}}} (\S+)', metrics).group(1))
+        self.assertGreaterEqual(queries, 1)
+
+    def test_unknown_methods_share_a_label(self):
+        self.client.generic('PROPFIND', '/api/transactions/')
+        self.client.generic('BREW', '/api/transactions/')
+        body = self.client.get('/api/_metrics/').content.decode()
+        self.assertIn('http_requests_total{view="TransactionViewSet.other",method="other",status="405"} 2', body)
+
+    def test_duplicate_queries_are_counted(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in (1, 1, 2):
+                list(Transaction.objects.filter(pk=pk))
+        self.assertEqual((recorder.count, recorder.duplicates), (3, 1))
+
+    def test_metrics_require_staff(self):
+        self.client.force_authenticate(self.teller)
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, 403)
+
+    def test_profile_on_request(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(INSTRUMENTATION_PROFILING=True, INSTRUMENTATION_PROFILE_DIR=directory):
+                response = self.client.get('/api/transactions/', HTTP_X_PROFILE='1')
+                self.assertTrue((Path(directory) / response['X-Profile']).exists())
+            with self.settings(INSTRUMENTATION_PROFILING=False, INSTRUMENTATION_PROFILE_DIR=directory):
+                response = self.client.get('/api/transactions/', HTTP_X_PROFILE='1')
+                self.assertNotIn('X-Profile', response)
+
+
+class OpenAPISchemaTests(TestCase):
+    def setUp(self):
+        from rjbcl.urls import schema_view
+        self.schema_view = schema_view
+        schema_view.rendered.clear()
+        self.addCleanup(schema_view.rendered.clear)
+
+    def test_schema_is_cached_and_revalidated(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/transactions/', json.loads(response.content)['paths'])
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        again = self.client.get('/swagger/?format=openapi')
+        self.assertEqual(again.content, response.content)
+        self.assertEqual(again['ETag'], response['ETag'])
+
+        not_modified = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        not_modified = self.client.get('/swagger.json', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_generated_file_is_served(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(OPENAPI_SCHEMA_DIR=directory):
+            call_command('generate_openapi_schema', stdout=io.StringIO())
+            files = sorted(path.suffix for path in Path(directory).iterdir())
+            self.assertEqual(files, ['.json', '.yaml'])
+
+            json_file = next(Path(directory).glob('*.json'))
+            json_file.write_bytes(json_file.read_bytes().replace(b'Your API Title', b'From File'))
+            response = self.client.get('/swagger.json')
+            self.assertEqual(json.loads(response.content)['info']['title'], 'From File')
+
+
+class ConditionalRequestTests(TransactionAPITestCase):
+    def test_detail_not_modified(self):
+        transaction = self.make_transactions(1)[0]
+        url = f'/api/transactions/{transaction.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('updated_date', response.data)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        self.client.post(f'/api/transactions/{transaction.pk}/verify/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bank_change_changes_transaction_etag(self):
+        transaction = self.make_transactions(1)[0]
+        etag = self.client.get(f'/api/transactions/{transaction.pk}/')['ETag']
+        self.bank.description = 'Head office'
+        self.bank.save()
+        self.assertNotEqual(self.client.get(f'/api/transactions/{transaction.pk}/')['ETag'], etag)
+
+    def test_username_change_changes_transaction_validators(self):
+        transaction = self.make_transactions(1)[0]
+        url = f'/api/transactions/{transaction.pk}/'
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        list_etag = self.client.get('/api/transactions/')['ETag']
+
+        self.teller.updated_date = timezone.now() + datetime.timedelta(seconds=2)
+        User.objects.filter(pk=self.teller.pk).update(username='desk_teller', updated_date=self.teller.updated_date)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created_by_username'], 'desk_teller')
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+        self.assertEqual(self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_list_not_modified(self):
+        self.make_transactions(3)
+        for url in ('/api/transactions/?page_size=2', '/api/banks/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        etag = self.client.get('/api/transactions/?page_size=2')['ETag']
+        self.client.post('/api/transactions/bulk-reconcile/', {'filter': {'status': ['Pending']}}, format='json')
+        self.assertEqual(self.client.get('/api/transactions/?page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_match_on_write(self):
+        transaction = self.make_transactions(1)[0]
+        url = f'/api/transactions/{transaction.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.patch(url, {'remarks': 'first'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.patch(url, {'remarks': 'second'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.remarks, 'first')
+
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+
+class BankCacheTests(TransactionAPITestCase):
+    def test_steady_state_runs_no_bank_queries(self):
+        self.make_transactions(3)
+        self.client.get('/api/transactions/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/transactions/')
+            response = self.client.post('/api/transactions/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['bank_name'], 'Nabil Bank')
+        self.assertFalse(any('statement_tracker_bank' in query['sql'] for query in ctx.captured_queries))
+
+    def test_bank_writes_invalidate(self):
+        self.assertEqual(bank_cache.get(self.bank.pk).name, 'Nabil Bank')
+        self.bank.name = 'Nabil Bank Limited'
+        self.bank.save()
+        self.assertEqual(bank_cache.get(self.bank.pk).name, 'Nabil Bank Limited')
+
+        other = Bank.objects.create(name='Global IME Bank', account_no='0002')
+        response = self.client.post('/api/banks/', {'name': 'global ime bank'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.data)
+        other.delete()
+        self.assertIsNone(bank_cache.get(other.pk))
+        response = self.client.post('/api/transactions/', self.payload(bank=other.pk), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bank', response.data)
+
+    def test_shared_catalogue_survives_process_restart(self):
+        bank_cache.catalogue()
+        bank_cache._catalogue = None  # as in a fresh worker process
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(bank_cache.get_by_name('NABIL BANK').pk, self.bank.pk)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_version_is_read_once_per_request(self):
+        self.make_transactions(20)
+        self.client.get('/api/transactions/')
+        with mock.patch.object(cache, 'get', wraps=cache.get) as cache_get:
+            response = self.client.get('/api/transactions/')
+        self.assertEqual(len(response.data['results']), 20)
+        version_reads = [call for call in cache_get.call_args_list if call.args[0] == banks.VERSION_KEY]
+        self.assertEqual(len(version_reads), 1)
+
+    def test_local_copy_expires(self):
+        bank_cache.catalogue()
+        # A write the version never heard of, as from another process with a per-process cache.
+        Bank.objects.filter(pk=self.bank.pk).update(name='Nabil Bank Limited')
+        self.assertEqual(bank_cache.get(self.bank.pk).name, 'Nabil Bank')
+        with mock.patch.object(banks, 'LOCAL_TIMEOUT', -1):
+            self.assertEqual(bank_cache.get(self.bank.pk).name, 'Nabil Bank Limited')
+
+    def test_bank_named_like_an_id_does_not_shadow_it(self):
+        numbered = Bank.objects.create(pk=100, name='Everest Bank', account_no='0002')
+        other = Bank.objects.create(name='100', account_no='0003')
+        catalogue = bank_cache.catalogue()
+        self.assertEqual(catalogue.resolve('100'), numbered)
+        self.assertEqual(catalogue.resolve(str(other.pk)), other)
+        self.assertEqual(catalogue.resolve('NABIL BANK'), self.bank)
+        self.assertEqual(bank_cache.get_by_name('100'), other)
+
+
+class FlakyEmailBackend(LocmemEmailBackend):
+    """Fails the first ``failures`` sends and counts how often it is opened."""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+
+    def send_messages(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class OutboxTests(TransactionAPITestCase):
+    def test_password_reset_only_enqueues(self):
+        self.client.force_authenticate(None)
+        response = self.client.post('/api/auth/password-reset/', {'email': self.staff.email}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual((queued.status, queued.to), ('Pending', [self.staff.email]))
+
+        call_command('send_queued_mail', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('reset-password-confirm', mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.body), ('Sent', ''))
+
+        # The reset link is never shown in the admin.
+        admin_user = User.objects.create_superuser('admin@example.com', 'admin_user', 'Admin User', 'pass12345')
+        self.client.force_login(admin_user)
+        response = self.client.get(f'/admin/statement_tracker/outgoingemail/{queued.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="body"')
+
+    def test_batch_reuses_one_connection(self):
+        for i in range(3):
+            outbox.enqueue(f'Notice {i}', 'Body', 'desk@example.com', ['a@example.com'])
+        backend = FlakyEmailBackend()
+        self.assertEqual(outbox.deliver_batch(connection=backend), (3, 0, 0))
+        self.assertEqual(backend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_retry_with_backoff_then_give_up(self):
+        with self.assertLogs('statement_tracker.outbox', 'WARNING'):
+            self._deliver_until_given_up()
+
+    def _deliver_until_given_up(self):
+        email = outbox.enqueue('Notice', 'Body', 'desk@example.com', ['a@example.com'])
+        self.assertEqual(outbox.deliver_batch(connection=FlakyEmailBackend(failures=1)), (0, 1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('Pending', 1))
+        self.assertIn('unexpectedly closed', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # Not due yet.
+        self.assertEqual(outbox.deliver_batch(connection=FlakyEmailBackend()), (0, 0, 0))
+
+        later = timezone.now() + datetime.timedelta(days=1)
+        results = [
+            outbox.deliver_batch(connection=FlakyEmailBackend(failures=1), now=later + datetime.timedelta(days=day))
+            for day in range(outbox.MAX_ATTEMPTS - 1)
+        ]
+        self.assertEqual(results[-1], (0, 0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.body), ('Failed', outbox.MAX_ATTEMPTS, ''))
+        self.assertEqual(mail.outbox, [])
+
+
+class AsyncReadViewTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.jwt_client(self.staff)
+
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserClaimsRefreshToken.for_user(user).access_token}')
+        return client
+
+    def assert_same_response(self, sync_url, async_url):
+        sync_response = self.client.get(sync_url)
+        async_response = self.client.get(async_url)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(
+            async_response.content.replace(b'/api/async/', b'/api/'), sync_response.content
+        )
+        return async_response
+
+    def test_responses_match_sync_endpoints(self):
+        transactions = self.make_transactions(3)
+        self.make_transactions(1, created_by=self.staff)
+
+        response = self.assert_same_response('/api/transactions/?page_size=2', '/api/async/transactions/?page_size=2')
+        next_page = json.loads(response.content)['next']
+        self.assertIn('/api/async/transactions/', next_page)
+        self.assert_same_response(
+            next_page.replace('/api/async/', '/api/'), next_page
+        )
+        self.assert_same_response(
+            '/api/transactions/?status=Pending&ordering=voucher_amount',
+            '/api/async/transactions/?status=Pending&ordering=voucher_amount',
+        )
+        self.assert_same_response(f'/api/transactions/{transactions[0].pk}/', f'/api/async/transactions/{transactions[0].pk}/')
+        self.assert_same_response('/api/transactions/999999/', '/api/async/transactions/999999/')
+        self.assert_same_response('/api/banks/', '/api/async/banks/')
+        self.assert_same_response('/api/users/me/', '/api/async/users/me/')
+
+        self.client = self.jwt_client(self.teller)
+        self.assert_same_response('/api/transactions/', '/api/async/transactions/')
+
+    def test_conditional_get(self):
+        transaction = self.make_transactions(1)[0]
+        url = f'/api/async/transactions/{transaction.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(etag, self.client.get(f'/api/transactions/{transaction.pk}/')['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_authentication(self):
+        response = APIClient().get('/api/async/transactions/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(client.get('/api/async/users/me/').status_code, 401)
+
+        self.teller.is_active = False
+        self.teller.save()
+        self.assertEqual(self.jwt_client(self.teller).get('/api/async/banks/').status_code, 401)
+        self.assertEqual(self.client.post('/api/async/banks/', {}).status_code, 405)
+
+
+class StatelessAuthenticationTests(TransactionAPITestCase):
+    def login(self, email):
+        response = APIClient().post('/api/auth/login/', {'email': email, 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        return client
+
+    def test_reads_do_not_load_the_user(self):
+        self.make_transactions(2)
+        client = self.login('staff@example.com')
+        client.get('/api/transactions/')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/transactions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertFalse([q for q in queries if 'FROM "statement_tracker_user"' in q['sql']])
+
+    def test_teller_scope_and_create(self):
+        self.make_transactions(1, created_by=self.staff)
+        own = self.make_transactions(1)[0]
+        client = self.login('teller@example.com')
+        response = client.get('/api/transactions/')
+        self.assertEqual([row['id'] for row in response.data['results']], [own.pk])
+
+        response = client.post('/api/transactions/', self.payload())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Transaction.objects.get(pk=response.data['id']).created_by, self.teller)
+        self.assertEqual(client.post(f'/api/transactions/{own.pk}/verify/').status_code, 403)
+
+    def test_user_changes_revoke_tokens(self):
+        client = self.login('teller@example.com')
+        self.assertEqual(client.get('/api/banks/').status_code, 200)
+
+        self.teller.is_staff = True
+        self.teller.save()
+        self.assertEqual(client.get('/api/banks/').status_code, 401)
+        client = self.login('teller@example.com')
+        self.assertEqual(client.get('/api/banks/').status_code, 200)
+
+        self.teller.set_password('new-pass12345')
+        self.teller.save()
+        self.assertEqual(client.get('/api/banks/').status_code, 401)
+        self.teller.set_password('pass12345')
+        self.teller.save()
+        client = self.login('teller@example.com')
+
+        self.teller.is_active = False
+        self.teller.save()
+        self.assertEqual(client.get('/api/transactions/').status_code, 401)
+        self.assertEqual(client.get('/api/async/transactions/').status_code, 401)
+
+
+class VoucherImageTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def photo(self, name='slip.jpg'):
+        # A landscape JPEG that EXIF says to rotate a quarter turn.
+        image = Image.new('RGB', (2400, 1200), 'white')
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        output = io.BytesIO()
+        image.save(output, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/jpeg')
+
+    def upload(self, transaction, upload):
+        # The files are written once the save commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/transactions/{transaction.pk}/', {'voucher_image': upload}, format='multipart'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_upload_stores_hashed_original_and_renditions(self):
+        first, second = self.make_transactions(2)
+        response = self.upload(first, self.photo())
+        name = Transaction.objects.get(pk=first.pk).voucher_image.name
+        self.assertRegex(name, r'^voucher_images/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+
+        renditions = response.data['voucher_image_renditions']
+        self.assertEqual(set(renditions), set(images.RENDITIONS))
+        self.assertTrue(renditions['thumbnail'].startswith('http://testserver/media/'))
+        with default_storage.open(images.rendition_name(name, 'thumbnail')) as f:
+            thumbnail = Image.open(f)
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (160, 320)))
+        with default_storage.open(images.rendition_name(name, 'display_jpeg')) as f:
+            display = Image.open(f)
+            self.assertEqual((display.format, display.size), ('JPEG', (800, 1600)))
+            self.assertNotIn(0x0112, display.getexif())
+
+        # The same slip again is stored once.
+        self.upload(second, self.photo('again.jpg'))
+        self.assertEqual(Transaction.objects.get(pk=second.pk).voucher_image.name, name)
+        self.assertEqual(len(default_storage.listdir(posixpath.dirname(name))[1]), 1 + len(images.RENDITIONS))
+
+        listed = self.client.get('/api/transactions/').data['results']
+        self.assertEqual({row['voucher_image_renditions']['thumbnail'] for row in listed}, {renditions['thumbnail']})
+
+    def test_rejects_non_images(self):
+        transaction = self.make_transactions(1)[0]
+        response = self.client.patch(
+            f'/api/transactions/{transaction.pk}/',
+            {'voucher_image': SimpleUploadedFile('slip.jpg', b'not an image')}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('voucher_image', response.data)
+        self.assertIsNone(self.client.get(f'/api/transactions/{transaction.pk}/').data['voucher_image_renditions'])
+
+    def test_rejects_truncated_images(self):
+        # Pillow's verify() accepts a JPEG cut short; decoding it does not.
+        transaction = self.make_transactions(1)[0]
+        data = self.photo().read()
+        upload = SimpleUploadedFile('slip.jpg', data[:len(data) // 2], content_type='image/jpeg')
+        response = self.client.patch(
+            f'/api/transactions/{transaction.pk}/', {'voucher_image': upload}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('voucher_image', response.data)
+        self.assertFalse(default_storage.exists(images.VOUCHER_IMAGE_DIR))
+
+    def test_concurrent_upload_of_same_image_keeps_one_copy(self):
+        transaction = self.make_transactions(1)[0]
+        save = default_storage.save
+
+        def racing_save(name, content, **kwargs):
+            # Another request stores the same file between the exists() check and this save.
+            if not default_storage.exists(name):
+                save(name, content)
+            return save(name, content, **kwargs)
+
+        with mock.patch.object(default_storage, 'save', side_effect=racing_save):
+            self.upload(transaction, self.photo())
+        name = Transaction.objects.get(pk=transaction.pk).voucher_image.name
+        self.assertEqual(len(default_storage.listdir(posixpath.dirname(name))[1]), 1 + len(images.RENDITIONS))
+
+    def test_rolled_back_save_writes_no_files(self):
+        transaction = self.make_transactions(1)[0]
+        transaction.voucher_image = self.photo()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with db_transaction.atomic():
+                transaction.save()
+                db_transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertFalse(default_storage.exists(images.VOUCHER_IMAGE_DIR))
+
+    def test_process_existing_images(self):
+        transaction = self.make_transactions(1)[0]
+        legacy = default_storage.save('voucher_images/slip.jpg', self.photo())
+        Transaction.objects.filter(pk=transaction.pk).update(voucher_image=legacy)
+
+        out = io.StringIO()
+        call_command('process_voucher_images', stdout=out)
+        self.assertIn('Processed 1 voucher images, 0 failed.', out.getvalue())
+        name = Transaction.objects.get(pk=transaction.pk).voucher_image.name
+        self.assertNotEqual(name, legacy)
+        self.assertTrue(default_storage.exists(images.rendition_name(name, 'thumbnail')))
+        call_command('process_voucher_images', stdout=out)
+        self.assertIn('Processed 0 voucher images', out.getvalue())
+
+
+class TransactionAdminTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser('admin@example.com', 'admin_user', 'Admin User', 'pass12345')
+        self.client.force_login(admin_user)
+
+    def test_changelist_joins_and_skips_full_count(self):
+        self.make_transactions(5)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/statement_tracker/transaction/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+        sql = [q['sql'] for q in queries]
+        # One COUNT for the paginator; show_full_result_count drops the unfiltered one.
+        self.assertEqual(len([q for q in sql if q.startswith('SELECT COUNT(*)')]), 1)
+        page = next(q for q in sql if 'FROM "statement_tracker_transaction" INNER JOIN' in q)
+        self.assertIn('"statement_tracker_bank"', page)
+        self.assertFalse([q for q in sql if 'WHERE "statement_tracker_bank"."id" =' in q])
+
+    def test_search_prefers_exact_identifiers(self):
+        target, other = self.make_transactions(2, transaction_detail='Premium deposit for V-0 renewal')
+        response = self.client.get('/admin/statement_tracker/transaction/', {'q': target.system_voucher_no})
+        self.assertEqual([t.pk for t in response.context['cl'].result_list], [target.pk])
+
+        response = self.client.get('/admin/statement_tracker/transaction/', {'q': 'renewal'})
+        self.assertEqual({t.pk for t in response.context['cl'].result_list}, {target.pk, other.pk})
+
+    def test_change_form_does_not_list_users_or_banks(self):
+        transaction = self.make_transactions(1)[0]
+        response = self.client.get(f'/admin/statement_tracker/transaction/{transaction.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, f'<option value="{self.teller.pk}"')
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertContains(response, 'admin-autocomplete')
+
+
+class TransactionSearchTests(TransactionAPITestCase):
+    def search(self, q, **params):
+        response = self.client.get('/api/transactions/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_matches_words_prefixes_and_identifiers(self):
+        ram, sita = self.make_transactions(2, transaction_detail='Premium deposit by customer')
+        Transaction.objects.filter(pk=ram.pk).update(transaction_detail='Deposit by Ram Bahadur Thapa')
+        sita.remarks = 'Sita Sharma renewal'
+        sita.save()
+
+        self.assertEqual(self.search('ram thapa'), [ram.pk])
+        self.assertEqual(self.search('Bahad'), [ram.pk])
+        self.assertEqual(self.search('sharma'), [sita.pk])
+        self.assertEqual(self.search(ram.system_voucher_no), [ram.pk])
+        self.assertEqual(self.search('premium'), [sita.pk])
+        self.assertEqual(self.search('?!'), [])
+
+        Transaction.objects.filter(pk=ram.pk).delete()
+        self.assertEqual(self.search('thapa'), [])
+        Transaction.objects.bulk_create([Transaction(
+            created_by=self.teller, bank=self.bank, bank_account_no='ACC-001', bank_trans_id='TRN-BULK',
+            bank_deposit_date=datetime.date(2025, 1, 1), transaction_detail='Thapa family deposit',
+            system_voucher_no='V-BULK', system_value_date=datetime.date(2025, 1, 2), voucher_amount='1.00',
+        )])
+        self.assertEqual(len(self.search('thapa')), 1)
+
+    def test_ranks_identifier_matches_first_and_pages_by_rank(self):
+        narration = self.make_transactions(3, transaction_detail='Refund against cheque 778899 request')
+        cheque = self.make_transactions(1, cheque_no='778899')[0]
+        self.assertEqual(self.search('778899')[0], cheque.pk)
+
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(cursor or '/api/transactions/', {'q': '778899', 'page_size': 1} if cursor is None else None)
+            ids += [row['id'] for row in response.data['results']]
+            cursor = response.data['next']
+            if cursor is None:
+                break
+        self.assertEqual(ids[0], cheque.pk)
+        self.assertEqual(sorted(ids), sorted([cheque.pk] + [t.pk for t in narration]))
+
+        self.assertEqual(self.search('778899', ordering='created_date'), sorted(ids))
+
+    def test_respects_teller_scope(self):
+        self.make_transactions(1, created_by=self.staff, remarks='Gorkha branch')
+        own = self.make_transactions(1, remarks='Gorkha branch')[0]
+        self.client.force_authenticate(self.teller)
+        self.assertEqual(self.search('gorkha'), [own.pk])
+
+
+class FingerprintTests(TransactionAPITestCase):
+    def test_normalises_identifiers(self):
+        first = self.make_transactions(1, cheque_no='0042')[0]
+        second = self.make_transactions(1, bank_account_no='acc001', cheque_no='42')[0]
+        self.assertEqual(len(first.fingerprint), 32)
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.assertNotEqual(first.fingerprint, self.make_transactions(1, voucher_amount='100.01')[0].fingerprint)
+
+    def test_api_rejects_likely_duplicate_unless_allowed(self):
+        existing = self.make_transactions(1)[0]
+        Transaction.objects.filter(pk=existing.pk).update(bank_trans_id=None)  # no bank id on record
+        # Typed differently from the stored row.
+        payload = self.payload(bank_account_no='acc-001', voucher_amount='100.0')
+        response = self.client.post('/api/transactions/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'transaction {existing.pk}', response.data['non_field_errors'][0])
+
+        response = self.client.post('/api/transactions/', dict(payload, allow_duplicate=True), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertNotIn('allow_duplicate', response.data)
+        self.assertEqual(response.data['fingerprint'], existing.fingerprint)
+
+        # Editing other fields of a known pair is not blocked.
+        response = self.client.patch(
+            f'/api/transactions/{response.data["id"]}/', {'remarks': 'Checked'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_distinct_bank_transaction_ids_are_not_duplicates(self):
+        response = self.client.post('/api/transactions/', self.payload(bank_trans_id='BT-A'), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        response = self.client.post(
+            '/api/transactions/', self.payload(bank_trans_id='BT-B', system_voucher_no='V-NEW-2'), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        # A deposit without an id may still be either of them.
+        response = self.client.post(
+            '/api/transactions/', self.payload(bank_trans_id=None, system_voucher_no='V-NEW-3'), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_reports_duplicates_of_stored_and_earlier_rows(self):
+        existing = self.make_transactions(1)[0]
+        Transaction.objects.filter(pk=existing.pk).update(bank_trans_id=None)  # no bank id on record
+        body = self.csv_header + ''.join(
+            self.csv_row(f'IMP-{i}', f'T-{i}', amount=amount)
+            for i, amount in enumerate(['100.00', '300.00', '300.00'])
+        )
+        upload = SimpleUploadedFile('statement.csv', body.encode(), content_type='text/csv')
+        response = self.client.post('/api/transactions/bulk-import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        # Rows 2 and 3 share a fingerprint but carry different bank transaction ids.
+        self.assertEqual(
+            [(error['row'], error['errors']['non_field_errors']) for error in response.data['errors']],
+            [(1, [f'Likely duplicate of transaction {existing.pk}.'])],
+        )
+
+        upload = SimpleUploadedFile('statement.csv', body.encode(), content_type='text/csv')
+        response = self.client.post(
+            '/api/transactions/bulk-import/', {'file': upload, 'allow_duplicates': 'true'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 3)
+
+    def test_backfill_command(self):
+        first, second = self.make_transactions(2)
+        Transaction.objects.update(fingerprint='')
+        out = io.StringIO()
+        call_command('backfill_fingerprints', stdout=out)
+        first.refresh_from_db()
+        self.assertEqual(first.fingerprint, first.compute_fingerprint())
+        self.assertIn('Updated 2 fingerprints', out.getvalue())
+        self.assertIn(f'{first.pk}, {second.pk}', out.getvalue())
+
+
+class SyntheticLedgerTests(TransactionAPITestCase):
+    def test_generates_valid_reproducible_ledger(self):
+        call_command('seed_ledger', transactions=300, users=4, staff=1, banks=3, batch_size=100, stdout=io.StringIO())
+        transactions = Transaction.objects.order_by('pk')
+        self.assertEqual(transactions.count(), 300)
+        self.assertEqual(User.objects.filter(username__startswith='bench_', is_staff=True).count(), 1)
+        self.assertTrue(User.objects.get(username='bench_0').check_password('bench-password'))
+        self.assertEqual(
+            set(transactions.values_list('source', flat=True)), {value for value, _ in Transaction.SOURCE_TYPES}
+        )
+        self.assertEqual(
+            set(transactions.values_list('status', flat=True)), {value for value, _ in Transaction.STATUS_CHOICES}
+        )
+        for transaction in transactions:
+            transaction.full_clean()
+            self.assertEqual(transaction.fingerprint, transaction.compute_fingerprint())
+        self.assertEqual(
+            sum(DailySummary.objects.values_list('transaction_count', flat=True)), 300
+        )
+        first_run = list(transactions.values_list('voucher_amount', 'status', 'source'))
+        Transaction.objects.all().delete()
+        call_command('seed_ledger', transactions=300, users=4, staff=1, banks=3, batch_size=100, stdout=io.StringIO())
+        self.assertEqual(list(transactions.values_list('voucher_amount', 'status', 'source')), first_run)
+
+        # Loaded without the search triggers, then indexed in one rebuild.
+        voucher = transactions.last().system_voucher_no
+        results = self.client.get('/api/transactions/', {'q': voucher}).data['results']
+        self.assertEqual([row['system_voucher_no'] for row in results], [voucher])
+        added = self.make_transactions(1, transaction_detail='Premium deposit by Zanskar')[0]
+        results = self.client.get('/api/transactions/', {'q': 'zanskar'}).data['results']
+        self.assertEqual([row['id'] for row in results], [added.pk])
+
+
+class LoadTestTests(TestCase):
+    def test_summary_and_server_timing(self):
+        self.assertEqual(
+            loadtest.server_queries({'server-timing': 'app;dur=4.1, db;dur=1.2;desc="3 queries, 0 duplicate"'}), 3
+        )
+        self.assertIsNone(loadtest.server_queries({}))
+
+        result = loadtest.Result()
+        result.elapsed = 2.0
+        result.latencies = [float(ms) for ms in range(1, 101)]
+        result.queries = [2, 4]
+        result.errors = 1
+        summary = result.summary()
+        self.assertEqual((summary['requests'], summary['ok'], summary['throughput_rps']), (101, 100, 50.0))
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (51.0, 96.0, 100.0))
+        self.assertEqual((summary['queries_mean'], summary['queries_max']), (3.0, 4))
+
+
+class TransactionListSerializerTests(TransactionAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_transactions(1)
+        self.make_transactions(
+            1, cheque_no='123456', policy_no='POL-1', remarks='Checked', source='Cheque', status='Reconciled',
+            reconciled_by=self.staff, reconciled_date=datetime.date(2025, 1, 3), system_posted_by=self.staff,
+            system_verified_by=self.teller, is_verified=True, used_in_system=True, credit='100.5',
+            refund_amount='12.50', refund_voucher_no='RF-1', reverse_voucher_no='RV-1',
+        )
+        refund = self.make_transactions(1, refund_amount=None, source='')[0]
+        Transaction.objects.filter(pk=refund.pk).update(voucher_image='voucher_images/ab/abcdef.jpg')
+
+    def test_rows_render_byte_for_byte_like_instances(self):
+        request = Request(APIRequestFactory().get('/api/transactions/'))
+        for context in ({'request': request}, {}):
+            instances = Transaction.objects.order_by('pk')
+            rows = instances.values(*TransactionListSerializer.row_lookups())
+            self.assertEqual(
+                JSONRenderer().render(TransactionListSerializer(rows, many=True, context=context).data),
+                JSONRenderer().render(TransactionSerializer(instances, many=True, context=context).data),
+            )
+
+    def test_list_endpoint_renders_rows(self):
+        response = self.client.get('/api/transactions/', {'ordering': 'voucher_amount'})
+        self.assertEqual(response.status_code, 200)
+        instances = Transaction.objects.order_by('voucher_amount', 'id')
+        expected = TransactionSerializer(instances, many=True, context={'request': response.wsgi_request}).data
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
+
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get('/api/transactions/', {'ordering': 'voucher_amount'}, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        Transaction.objects.filter(pk=instances[0].pk).update(remarks='Changed', updated_date=timezone.now())
+        self.assertNotEqual(self.client.get('/api/transactions/', {'ordering': 'voucher_amount'})['ETag'], etag)
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .viewsets import UserViewSet, BankViewSet, TransactionViewSet, PasswordChangeView, PasswordResetRequestView, PasswordResetConfirmView
+from .viewsets import UserViewSet, BankViewSet, TransactionViewSet, PasswordChangeView, PasswordResetRequestView, PasswordResetConfirmView, SummaryReportView, DashboardMetricsView, MetricsView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import api_index
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -17,4 +18,12 @@ urlpatterns = [
     path('api/auth/change-password/', PasswordChangeView.as_view(), name='change_password'),
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/reports/summary/', SummaryReportView.as_view(), name='report_summary'),
+    path('api/dashboard/metrics/', DashboardMetricsView.as_view(), name='dashboard_metrics'),
+    path('api/_metrics/', MetricsView.as_view(), name='metrics'),
+    # Async read endpoints, for ASGI deployments.
+    path('api/async/transactions/', async_views.transaction_list, name='async_transaction_list'),
+    path('api/async/transactions/<int:pk>/', async_views.transaction_detail, name='async_transaction_detail'),
+    path('api/async/banks/', async_views.bank_list, name='async_bank_list'),
+    path('api/async/users/me/', async_views.user_me, name='async_user_me'),
 ]
@@ -0,0 +1,88 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class TransactionValidator:
+    """
+    The Transaction business rules, with patterns compiled once.
+
+    ``errors()`` checks one object and returns an error dict.
+    ``validate_many()`` checks a batch, e.g. an import, and evaluates "today"
+    only once for the whole batch.
+    """
+    ACCOUNT_NO_RE = re.compile(r'^[a-zA-Z0-9\-]+$')
+    VOUCHER_NO_RE = re.compile(r'^[a-zA-Z0-9\-_/]+$')
+    RELATED_VOUCHER_FIELDS = tuple(
+        (field_name, _(f'{field_name.replace("_", " ").title()} contains invalid characters.'))
+        for field_name in ('reverse_voucher_no', 'reversal_correction_voucher_no', 'refund_voucher_no')
+    )
+
+    def errors(self, obj, today=None):
+        errors = {}
+        today = today or timezone.now().date()
+
+        if obj.bank_deposit_date > today:
+            errors['bank_deposit_date'] = _('Deposit date cannot be in the future.')
+        if obj.system_value_date > today:
+            errors['system_value_date'] = _('Value date cannot be in the future.')
+        if obj.bank_deposit_date > obj.system_value_date:
+            errors['system_value_date'] = _('Value date cannot be before deposit date.')
+
+        if obj.debit < 0:
+            errors['debit'] = _('Debit amount cannot be negative.')
+        if obj.credit < 0:
+            errors['credit'] = _('Credit amount cannot be negative.')
+        if obj.debit > 0 and obj.credit > 0:
+            errors['debit'] = errors['credit'] = _('Cannot have both debit and credit amounts.')
+        if obj.voucher_amount <= 0:
+            errors['voucher_amount'] = _('Voucher amount must be positive.')
+
+        if obj.refund_amount is not None:
+            if obj.refund_amount < 0:
+                errors['refund_amount'] = _('Refund amount cannot be negative.')
+            if obj.refund_amount > obj.voucher_amount:
+                errors['refund_amount'] = _('Refund cannot exceed voucher amount.')
+
+        if not obj.bank_account_no or not obj.bank_account_no.strip():
+            errors['bank_account_no'] = _('Account number is required.')
+        elif not self.ACCOUNT_NO_RE.match(obj.bank_account_no):
+            errors['bank_account_no'] = _('Account number contains invalid characters.')
+
+        if obj.cheque_no and not self.ACCOUNT_NO_RE.match(obj.cheque_no):
+            errors['cheque_no'] = _('Cheque number contains invalid characters.')
+
+        if not obj.transaction_detail or len(obj.transaction_detail.strip()) < 10:
+            errors['transaction_detail'] = _('Detail must be at least 10 characters.')
+
+        if not obj.system_voucher_no or not obj.system_voucher_no.strip():
+            errors['system_voucher_no'] = _('Voucher number is required.')
+        elif not self.VOUCHER_NO_RE.match(obj.system_voucher_no):
+            errors['system_voucher_no'] = _('Voucher number contains invalid characters.')
+
+        for field_name, message in self.RELATED_VOUCHER_FIELDS:
+            value = getattr(obj, field_name)
+            if value and not self.VOUCHER_NO_RE.match(value):
+                errors[field_name] = message
+
+        return errors
+
+    def validate(self, obj):
+        errors = self.errors(obj)
+        if errors:
+            raise ValidationError(errors)
+
+    def validate_many(self, objs):
+        """Return ``[(index, errors), ...]`` for the objects that fail."""
+        today = timezone.now().date()
+        failures = []
+        for index, obj in enumerate(objs):
+            errors = self.errors(obj, today)
+            if errors:
+                failures.append((index, errors))
+        return failures
+
+
+transaction_validator = TransactionValidator()
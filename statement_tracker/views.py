@@ -11,6 +11,10 @@ def api_index(request, format=None):
         'users': reverse('user-list', request=request, format=format),
         'banks': reverse('bank-list', request=request, format=format),
         'transactions': reverse('transaction-list', request=request, format=format),
+        'reports': {
+            'summary': reverse('report_summary', request=request, format=format),
+            'dashboard_metrics': reverse('dashboard_metrics', request=request, format=format),
+        },
         'auth': {
             'login': reverse('token_obtain_pair', request=request, format=format),
             'refresh': reverse('token_refresh', request=request, format=format),
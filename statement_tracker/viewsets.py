@@ -9,17 +9,18 @@ from rest_framework import status
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
 from django.conf import settings
 from .serializers import PasswordResetRequestSerializer
 from django.utils import timezone
-from .models import Bank, Transaction
+from django.db import transaction as db_transaction
+from .models import Bank, Transaction, DailySummary
+from django.db.models import Sum
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, UserDetailSerializer, BankSerializer, TransactionSerializer, PasswordResetConfirmSerializer, PasswordResetRequestSerializer
+from .serializers import UserSerializer, UserDetailSerializer, BankSerializer, TransactionSerializer, TransactionListSerializer, PasswordResetConfirmSerializer, PasswordResetRequestSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .serializers import PasswordChangeSerializer
+from .serializers import PasswordChangeSerializer, TransactionBulkActionSerializer, StatementLineSerializer, SummaryReportQuerySerializer, DashboardMetricsQuerySerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -27,6 +28,19 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from .serializers import PasswordResetRequestSerializer, PasswordResetConfirmSerializer
+from .pagination import TransactionCursorPagination
+from . import dashboard, outbox, summaries
+from .instrumentation import registry as metrics_registry
+from django.http import HttpResponse
+from .imports import ImportFormatError, TransactionImporter, read_rows, detect_format, bank_lookup
+from .matching import DEFAULT_DATE_TOLERANCE, StatementLine, match_statement
+from rest_framework.parsers import MultiPartParser
+from .exports import csv_response, xlsx_response
+from .filters import TransactionFilterBackend, TransactionSearchFilter
+from .conditional import ConditionalModelMixin
+from .banks import bank_cache
+from .authentication import StatelessJWTAuthentication
+from rest_framework.filters import OrderingFilter
 
 User = get_user_model()
 
@@ -82,12 +96,13 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = UserDetailSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
-class BankViewSet(viewsets.ModelViewSet):
+class BankViewSet(ConditionalModelMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows banks to be viewed or edited.
     """
     queryset = Bank.objects.all().order_by('name')
     serializer_class = BankSerializer
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
 
@@ -96,32 +111,30 @@ class BankViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        return Response(
+        response = Response(
             serializer.data,
             status=status.HTTP_201_CREATED,
             headers=headers
         )
+        return self.set_validators(response, serializer.instance)
 
-    def update(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
-        serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        return Response(serializer.data)
-
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ConditionalModelMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows transactions to be viewed or edited.
     """
-    queryset = Transaction.objects.all().order_by('-created_date')
+    # The bank comes from the bank cache, so it is not joined.
+    queryset = Transaction.objects.select_related(
+        'created_by', 'reconciled_by', 'system_posted_by', 'system_verified_by'
+    ).order_by('-created_date')
     serializer_class = TransactionSerializer
+    # request.user is a TokenUser here: refer to users by id.
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionCursorPagination
+    filter_backends = [TransactionFilterBackend, TransactionSearchFilter, OrderingFilter]
+    ordering_fields = ['created_date', 'bank_deposit_date', 'system_value_date', 'voucher_amount']
+    # Checked and changed under a row lock, so concurrent calls cannot both apply.
+    locking_actions = ('verify', 'reconcile')
 
     
     def get_queryset(self):
@@ -129,69 +142,289 @@ class TransactionViewSet(viewsets.ModelViewSet):
         Optionally filter transactions by user if not admin
         """
         queryset = super().get_queryset()
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
         if not self.request.user.is_staff:
-            queryset = queryset.filter(created_by=self.request.user)
+            queryset = queryset.filter(created_by_id=self.request.user.id)
+        if self.action == 'list':
+            # Lists render plain rows, see TransactionListSerializer.
+            queryset = queryset.values(*TransactionListSerializer.row_lookups())
         return queryset
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return TransactionListSerializer
+        return super().get_serializer_class()
+
+    def get_versions(self, instance):
+        # bank_name and the *_by_username fields are part of the representation.
+        if isinstance(instance, dict):
+            versions = [instance['updated_date'], bank_cache.get(instance['bank']).updated_date]
+            users = [instance[f'{relation}__updated_date'] for relation in Transaction.USER_RELATIONS]
+        else:
+            versions = [instance.updated_date, bank_cache.get(instance.bank_id).updated_date]
+            users = [
+                getattr(instance, relation).updated_date
+                for relation in Transaction.USER_RELATIONS if getattr(instance, f'{relation}_id') is not None
+            ]
+        return versions + [version for version in users if version is not None]
+
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        serializer.save(created_by_id=self.request.user.id)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        return Response(
+        response = Response(
             serializer.data,
             status=status.HTTP_201_CREATED,
             headers=headers
         )
-
-    def update(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
-        serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        return Response(serializer.data)
-
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.set_validators(response, serializer.instance)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def verify(self, request, pk=None):
-        transaction = self.get_object()
-        if transaction.is_verified:
-            return Response(
-                {'status': 'transaction already verified'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        transaction.is_verified = True
-        transaction.save(update_fields=['is_verified'])
+        with db_transaction.atomic():
+            transaction = self.get_object()
+            if transaction.is_verified:
+                return Response(
+                    {'status': 'transaction already verified'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            transaction.is_verified = True
+            transaction.save(update_fields=['is_verified', 'updated_date'], validate=False)
         return Response({'status': 'transaction verified'})
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def reconcile(self, request, pk=None):
-        transaction = self.get_object()
-        if transaction.status == 'Reconciled':
-            return Response(
-                {'status': 'transaction already reconciled'},
-                status=status.HTTP_400_BAD_REQUEST
+        with db_transaction.atomic():
+            transaction = self.get_object()
+            if transaction.status == 'Reconciled':
+                return Response(
+                    {'status': 'transaction already reconciled'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            transaction.status = 'Reconciled'
+            transaction.reconciled_by_id = request.user.id
+            transaction.reconciled_date = timezone.now().date()
+            transaction.save(
+                update_fields=['status', 'reconciled_by', 'reconciled_date', 'updated_date'], validate=False
             )
-
-        transaction.status = 'Reconciled'
-        transaction.reconciled_by = request.user
-        transaction.reconciled_date = timezone.now().date()
-        transaction.save(update_fields=['status', 'reconciled_by', 'reconciled_date'])
         return Response({'status': 'transaction reconciled'})
+
+    @action(detail=False, methods=['post'], url_path='bulk-verify', permission_classes=[permissions.IsAdminUser])
+    def bulk_verify(self, request):
+        return self._bulk_transition(request, 'is_verified', True, {'is_verified': True})
+
+    @action(detail=False, methods=['post'], url_path='bulk-reconcile', permission_classes=[permissions.IsAdminUser])
+    def bulk_reconcile(self, request):
+        return self._bulk_transition(request, 'status', 'Reconciled', self._reconcile_changes(request))
+
+    def _reconcile_changes(self, request):
+        return {
+            'status': 'Reconciled',
+            'reconciled_by_id': request.user.id,
+            'reconciled_date': timezone.now().date(),
+        }
+
+    def _bulk_transition(self, request, field, target, changes):
+        """
+        Move the selected transactions to ``field == target`` with a single
+        conditional UPDATE, and report which ids changed, which were already
+        in the target state and which were not found.
+        """
+        serializer = TransactionBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+
+        queryset = self.get_queryset()
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        else:
+            queryset = TransactionFilterBackend.apply(queryset, serializer.validated_data['filter'])
+
+        current = self._apply_transition(queryset, field, target, changes)
+        changed = sorted(pk for pk, value in current.items() if value != target)
+        already = sorted(pk for pk, value in current.items() if value == target)
+        missing = sorted(set(ids) - current.keys()) if ids is not None else []
+        return Response({'changed': changed, 'already': already, 'missing': missing})
+
+    def _apply_transition(self, queryset, field, target, changes):
+        """Run the conditional UPDATE; return ``{pk: previous value}`` of the selection."""
+        with db_transaction.atomic():
+            # Lock the selection so the report matches what the UPDATE did.
+            current = dict(queryset.select_for_update(of=('self',)).values_list('pk', field))
+            if 'status' in changes:
+                summaries.record_status_change(queryset, changes['status'])
+            queryset.exclude(**{field: target}).update(updated_date=timezone.now(), **changes)
+            dashboard.invalidate()
+        return current
+
+    @action(detail=False, methods=['post'], url_path='match-statement',
+            parser_classes=[MultiPartParser], permission_classes=[permissions.IsAdminUser])
+    def match_statement(self, request):
+        """
+        Match an uploaded bank statement (CSV or JSON lines with bank, amount,
+        date and optionally bank_account_no, bank_trans_id, cheque_no) against
+        unreconciled transactions. ``date_tolerance`` sets the allowed deposit
+        date difference in days; ``apply=true`` reconciles the confirmed matches.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_tolerance = int(request.data.get('date_tolerance', DEFAULT_DATE_TOLERANCE))
+        except (TypeError, ValueError):
+            return Response({'date_tolerance': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        context = {'banks': bank_lookup()}
+        lines, errors = [], []
+        try:
+            for row_number, row in read_rows(upload, detect_format(upload)):
+                serializer = StatementLineSerializer(data=row or {}, context=context)
+                if not serializer.is_valid():
+                    errors.append({'row': row_number, 'errors': serializer.errors})
+                    continue
+                data = serializer.validated_data
+                lines.append(StatementLine(
+                    row_number, data['bank'].pk, data['bank_account_no'], data['bank_trans_id'],
+                    data['cheque_no'], data['amount'], data['date'],
+                ))
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            return Response({'file': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = match_statement(lines, date_tolerance, self.get_queryset())
+        data = result.as_dict()
+        if str(request.data.get('apply', '')).lower() in ('1', 'true'):
+            ids = [match['transaction'] for match in data['matched']]
+            queryset = self.get_queryset().filter(pk__in=ids)
+            self._apply_transition(queryset, 'status', 'Reconciled', self._reconcile_changes(request))
+            data['reconciled'] = sorted(ids)
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Import a CSV or JSON-lines bank statement uploaded as ``file``.
+        All rows are inserted, or none are and the per-row errors are returned.
+        Likely duplicate deposits are errors unless ``allow_duplicates=true``.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_rows(upload, detect_format(upload))
+            allow_duplicates = str(request.data.get('allow_duplicates', '')).lower() in ('1', 'true')
+            created, errors = TransactionImporter(request.user, allow_duplicates=allow_duplicates).run(rows)
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            return Response({'file': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if errors:
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': created, 'errors': []}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every transaction visible to the user as CSV, or send them as
+        XLSX with ``?export_format=xlsx``. The XLSX workbook is spooled to a
+        temporary file and sent once complete, not streamed.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format == 'csv':
+            return csv_response(queryset)
+        if export_format == 'xlsx':
+            return xlsx_response(queryset)
+        return Response(
+            {'export_format': ['Choose "csv" or "xlsx".']},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     
 
 
 
+class SummaryReportView(APIView):
+    """
+    Totals of transactions by deposit date, bank, account, source and status,
+    read from the DailySummary table. ``group_by`` (repeatable) picks the
+    dimensions and defaults to ``date``.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    lookups = {
+        'date_from': 'date__gte',
+        'date_to': 'date__lte',
+        'bank': 'bank_id__in',
+        'bank_account_no': 'bank_account_no',
+        'source': 'source__in',
+        'status': 'status__in',
+    }
+
+    def get(self, request):
+        serializer = SummaryReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        group_by = list(dict.fromkeys(params.pop('group_by', None) or ['date']))
+        columns = ['bank_id' if name == 'bank' else name for name in group_by]
+
+        rows = (
+            DailySummary.objects.filter(**{self.lookups[name]: value for name, value in params.items()})
+            .values(*columns)
+            .annotate(
+                count_total=Sum('transaction_count'),
+                credit_total=Sum('credit'),
+                debit_total=Sum('debit'),
+                voucher_total=Sum('voucher_amount'),
+                refund_total=Sum('refund_amount'),
+            )
+            .order_by(*columns)
+        )
+        results = []
+        for row in rows:
+            result = {name: row[column] for name, column in zip(group_by, columns)}
+            if 'source' in result:
+                result['source'] = result['source'] or None
+            result.update({
+                'transaction_count': row['count_total'],
+                'credit': f"{row['credit_total']:.2f}",
+                'debit': f"{row['debit_total']:.2f}",
+                'voucher_amount': f"{row['voucher_total']:.2f}",
+                'refund_amount': f"{row['refund_total']:.2f}",
+            })
+            results.append(result)
+        return Response({'group_by': group_by, 'results': results})
+
+
+class DashboardMetricsView(APIView):
+    """
+    Pre-bucketed dashboard series: deposits and refunds per day, counts by
+    source and status, and the verification backlog, for the last ``days``
+    days. Served from the cache; any Transaction write invalidates it.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        serializer = DashboardMetricsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(dashboard.get_metrics(serializer.validated_data['days']))
+
+
+class MetricsView(APIView):
+    """Request metrics of this process in the Prometheus text format."""
+    permission_classes = [permissions.IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class PasswordChangeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -221,7 +454,8 @@ class PasswordResetRequestView(APIView):
             from_email = settings.DEFAULT_FROM_EMAIL
             recipient_list = [email]
 
-            send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+            # Delivered by the send_queued_mail worker, not in the request.
+            outbox.enqueue(subject, message, from_email, recipient_list)
 
             return Response({"message": "Password reset link sent to your email."})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)